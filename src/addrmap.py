@@ -0,0 +1,124 @@
+#! /usr/bin/python3
+
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import array
+import bisect
+
+# Maps absolute addresses to the units and registers of a merged model.
+#
+# Units are kept sorted by their start address, registers of each unit
+# by their offset; start and end positions are stored in arrays so that
+# an address is found by two binary searches.  Registers occupy
+# '(width + 7) / 8' bytes starting at their offset.
+#
+# The map is a snapshot; it must be created again when the model
+# changes.
+class AddressMap:
+    def __init__(self, units):
+        units = sorted(units, key = lambda u: u.get_address())
+
+        self.__units = units
+        self.__starts = array.array('Q', (u.get_address() for u in units))
+        self.__ends = array.array('Q', (u.get_address() + u.get_size()
+                                        for u in units))
+
+        # per unit: (registers, offsets, end offsets)
+        self.__regs = []
+        for u in units:
+            regs = u.get_sorted_registers()
+            offs = array.array('Q', (r.get_offset() for r in regs))
+            ends = array.array('Q', (r.get_offset() + AddressMap.__size(r)
+                                     for r in regs))
+
+            self.__regs.append((regs, offs, ends))
+
+    @staticmethod
+    def __size(reg):
+        return (reg.get_regwidth() + 7) // 8
+
+    @staticmethod
+    def __find(starts, ends, addr):
+        idx = bisect.bisect_right(starts, addr) - 1
+        if idx < 0 or addr >= ends[idx]:
+            return None
+
+        return idx
+
+    # returns a '(unit, register)' tuple for 'addr' or None when 'addr'
+    # is not within a unit.  'register' is None when 'addr' is within
+    # the unit but not covered by one of its registers.  Results for
+    # overlapping units or registers are unspecified.
+    def lookup(self, addr):
+        idx = self.__find(self.__starts, self.__ends, addr)
+        if idx is None:
+            return None
+
+        (regs, offs, ends) = self.__regs[idx]
+        ridx = self.__find(offs, ends, addr - self.__starts[idx])
+
+        return (self.__units[idx],
+                None if ridx is None else regs[ridx])
+
+    # checks sorted 'starts' and 'ends' for overlapping intervals;
+    # returns a list of index pairs.  Exact aliases (e.g. a read-only
+    # and a write-only register at the same offset with the same width)
+    # are intentional and not reported.
+    @staticmethod
+    def __overlaps(starts, ends):
+        res = []
+        last = None             # index of interval with the highest end
+
+        for i in range(len(starts)):
+            if last is None or starts[i] >= ends[last]:
+                pass
+            elif starts[i] != starts[last] or ends[i] != ends[last]:
+                res.append((last, i))
+
+            if last is None or ends[i] > ends[last]:
+                last = i
+
+        return res
+
+    # returns messages about units which overlap each other, registers
+    # which overlap each other and registers which exceed their unit;
+    # exact aliases are not reported
+    def check_overlaps(self):
+        res = []
+
+        for (a, b) in self.__overlaps(self.__starts, self.__ends):
+            res.append("unit '%s' (0x%08x-0x%08x) overlaps '%s' (0x%08x-0x%08x)" %
+                       (self.__units[a].get_id(),
+                        self.__starts[a], self.__ends[a] - 1,
+                        self.__units[b].get_id(),
+                        self.__starts[b], self.__ends[b] - 1))
+
+        for (i, u) in enumerate(self.__units):
+            (regs, offs, ends) = self.__regs[i]
+            size = self.__ends[i] - self.__starts[i]
+
+            for (a, b) in self.__overlaps(offs, ends):
+                res.append("%s: register '%s' (+0x%x) overlaps '%s' (+0x%x)" %
+                           (u.get_id(),
+                            regs[a].get_id(False), offs[a],
+                            regs[b].get_id(False), offs[b]))
+
+            for (r, end) in zip(regs, ends):
+                if end > size:
+                    res.append("%s: register '%s' (+0x%x) exceeds unit size 0x%x" %
+                               (u.get_id(), r.get_id(False), r.get_offset(),
+                                size))
+
+        return res
@@ -19,16 +19,13 @@ import pin
 
 class Top(block.Top):
     class __Parser(block.Parser):
+        ARG_RANGES = {
+            '@bga' : 1,
+        }
+
         def __init__(self, obj):
             super().__init__(obj)
 
-        def _validate(self, l):
-            ARG_RANGES = {
-                '@bga' : 1,
-            }
-
-            return self._validate_ranges(l, ARG_RANGES)
-
         def _parse(self, l, enabled):
             tag = l[0]
             res = self.o
@@ -43,9 +40,10 @@ class Top(block.Top):
 
             return res
 
+    _PARSERS = (__Parser,)
+
     def __init__(self):
         block.Top.__init__(self)
-        self.add_parser(Top.__Parser(self))
 
     def __repr__(self):
         return "%s" % self.children
@@ -74,20 +72,17 @@ class Top(block.Top):
 
 class BGA(block.Top):
     class __Parser(block.Parser):
+        ARG_RANGES = {
+            '@pins' : 1,
+            '@rows' : 1,
+            '@cols' : 1,
+            "@skiprows" : [1, -1],
+            "@skipcols" : [1, -1],
+        }
+
         def __init__(self, obj):
             super().__init__(obj)
 
-        def _validate(self, l):
-            ARG_RANGES = {
-                '@pins' : 1,
-                '@rows' : 1,
-                '@cols' : 1,
-                "@skiprows" : [1, -1],
-                "@skipcols" : [1, -1],
-            }
-
-            return self._validate_ranges(l, ARG_RANGES)
-
         def _parse(self, l, enabled):
             tag = l[0]
             res = self.o
@@ -109,9 +104,10 @@ class BGA(block.Top):
 
             return res
 
+    _PARSERS = (__Parser,)
+
     def __init__(self, top, id):
         block.Top.__init__(self)
-        self.add_parser(BGA.__Parser(self))
         self.__id       = id
         self.__pinglobs = []
         self.__pintop   = None
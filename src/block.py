@@ -15,53 +15,315 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import abc
-import copy
 import sys
 import os.path
+import collections
 
 class Preprocessor:
     class _SubprocessWrapper:
-        def __init__(self, cmdline):
-            import subprocess, io
-
-            self.__proc = subprocess.Popen(cmdline,
-                                           stdout = subprocess.PIPE)
-            self.__stdout = io.TextIOWrapper(self.__proc.stdout)
+        def __init__(self, cmdline, spool = False):
+            import subprocess, io, tempfile
+
+            if spool:
+                # output is written into a temporary file so that the
+                # process can run to completion without a reader
+                self.__spool  = tempfile.TemporaryFile()
+                self.__stdout = None
+                self.__proc   = subprocess.Popen(cmdline,
+                                                 stdout = self.__spool)
+            else:
+                self.__spool  = None
+                self.__proc   = subprocess.Popen(cmdline,
+                                                 stdout = subprocess.PIPE)
+                self.__stdout = io.TextIOWrapper(self.__proc.stdout)
 
         def __exit__(self, exc_type, exc_value, traceback):
-            self.__stdout.close()
+            if self.__stdout:
+                self.__stdout.close()
+            elif self.__spool:
+                self.__spool.close()
+
             ret = self.__proc.wait()
-            if ret != 0:
+
+            # output is consumed while the process is running; when
+            # parsing failed, the process might have been terminated by
+            # the closed pipe and the original error must be reported
+            if ret != 0 and exc_type is None:
                 raise Exception("subprocess failed with %d" % ret)
 
         def __enter__(self):
+            if self.__spool and not self.__stdout:
+                import io
+
+                ret = self.__proc.wait()
+                if ret != 0:
+                    self.__spool.close()
+                    raise Exception("subprocess failed with %d" % ret)
+
+                self.__spool.seek(0)
+                self.__stdout = io.TextIOWrapper(self.__spool)
+
             return self.__stdout
 
     def __init__(self, name):
         self.__name = name
 
+    # whether the tokenized output depends only on the content of the
+    # file itself and can be stored in the token cache
+    def is_cacheable(self):
+        return False
+
 class Preprocessor_m4(Preprocessor):
+    # builtins whose expansion does not depend on the input files only;
+    # output of files using them is not cached
+    _UNCACHEABLE = ['m4_syscmd', 'm4_esyscmd', 'm4_sinclude',
+                    'm4_maketemp', 'm4_mkstemp']
+
+    class _CachingWrapper(Preprocessor._SubprocessWrapper):
+        def __init__(self, cmdline, spool, debugfile, cache, key, dirs):
+            Preprocessor._SubprocessWrapper.__init__(self, cmdline, spool)
+
+            self.__debugfile = debugfile
+            self.__dirs = dirs
+            self.__cache = cache
+            self.__key = key
+            self.__lines = []
+            self.__is_complete = False
+
+        def __record(self, input):
+            for l in input:
+                self.__lines.append(l)
+                yield l
+
+            self.__is_complete = True
+
+        def __enter__(self):
+            # __exit__() is not called when __enter__() fails (e.g. when
+            # a spooled m4 failed)
+            try:
+                input = Preprocessor._SubprocessWrapper.__enter__(self)
+            except:
+                os.unlink(self.__debugfile)
+                raise
+
+            return self.__record(input)
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            try:
+                Preprocessor._SubprocessWrapper.__exit__(self, exc_type,
+                                                         exc_value, traceback)
+
+                if exc_type is None and self.__is_complete:
+                    self.__store()
+            finally:
+                os.unlink(self.__debugfile)
+
+        # returns the files which would have shadowed 'found' when they
+        # had existed; 'name' was searched in the include directories
+        def __get_shadows(self, name, found):
+            res = []
+            for d in self.__dirs:
+                fname = os.path.abspath(os.path.join(d, name))
+                if fname == found:
+                    break
+
+                res.append(fname)
+
+            return res
+
+        def __store(self):
+            deps = []
+            missing = []
+
+            with open(self.__debugfile) as f:
+                for l in f:
+                    if l.startswith('m4trace:'):
+                        # used some builtin from _UNCACHEABLE
+                        return
+
+                    if l.startswith('m4debug: input read from '):
+                        deps.append(os.path.abspath(l[25:].rstrip('\n')))
+                    elif l.startswith('m4debug: path search for `'):
+                        tmp = l[26:].rstrip('\n').split("' found `")
+                        if len(tmp) != 2 or not tmp[1].endswith("'"):
+                            # can not tell which files shadow the result
+                            return
+
+                        missing.extend(self.__get_shadows(
+                            tmp[0], os.path.abspath(tmp[1][:-1])))
+
+            # first file is the main file itself; 'missing' files are
+            # recorded as dependencies which must not exist
+            self.__cache.store(self.__key, ''.join(self.__lines),
+                               deps[1:] + missing)
+
     def __init__(self):
         Preprocessor.__init__(self, "m4")
+        self.__tool = None
+
+    @staticmethod
+    def __cmdline(file):
+        return ['m4', '-E', '-Q', '-P', '-I', os.path.dirname(file)]
+
+    # returns the directories in which m4 searches included files; this
+    # is the current directory followed by the '-I' ones
+    @staticmethod
+    def __include_dirs(file):
+        return [os.getcwd(), os.path.abspath(os.path.dirname(file))]
+
+    # identifies the m4 program by its location, size and mtime; this
+    # avoids spawning 'm4 --version' in every run
+    def __get_tool(self):
+        if self.__tool is None:
+            import shutil
+
+            prog = shutil.which('m4')
+            if prog is None:
+                raise Exception("m4 program not found")
+
+            prog = os.path.realpath(prog)
+            st   = os.stat(prog)
+
+            self.__tool = [prog, str(st.st_mtime_ns), str(st.st_size)]
+
+        return self.__tool
+
+    def call(self, file, spool = False):
+        cmdline = self.__cmdline(file)
+        cache   = _preprocessor_cache
+
+        if not cache:
+            return Preprocessor._SubprocessWrapper(cmdline + [file], spool)
 
-    def call(self, file):
-        return Preprocessor._SubprocessWrapper(['m4', '-E', '-Q', '-P',
-                                                '-I', os.path.dirname(file),
-                                                file])
+        dirs = self.__include_dirs(file)
+
+        (text, key) = cache.lookup(file, self.__get_tool() + cmdline + dirs)
+        if text is not None:
+            import io
+            return io.StringIO(text)
+
+        import tempfile
+
+        (fd, debugfile) = tempfile.mkstemp(prefix = 'm4debug-')
+        os.close(fd)
+
+        cmdline += ['--debug=ip', '--debugfile=' + debugfile]
+        for m in self._UNCACHEABLE:
+            cmdline += ['-t', m]
+
+        return Preprocessor_m4._CachingWrapper(cmdline + [file], spool,
+                                               debugfile, cache, key, dirs)
 
 class Preprocessor_plain(Preprocessor):
     def __init__(self):
         Preprocessor.__init__(self, "plain")
 
-    def call(self, file):
+    def call(self, file, spool = False):
         return open(file)
 
+    def is_cacheable(self):
+        return True
+
+# expands a subset of m4 in-process; falls back to the real m4 when
+# the file uses other builtins
+class Preprocessor_m4lite(Preprocessor):
+    class _Wrapper:
+        def __init__(self, file):
+            self.__file = file
+
+        def __lines(self):
+            import m4lite
+
+            cnt = 0
+            try:
+                for l in m4lite.Engine(self.__file).lines():
+                    cnt += 1
+                    yield l
+
+                return
+            except m4lite.Unsupported:
+                pass
+
+            # lines emitted so far are the same as the ones produced by
+            # m4; skip them
+            with _preprocessors['m4'].call(self.__file) as input:
+                for l in input:
+                    if cnt > 0:
+                        cnt -= 1
+                    else:
+                        yield l
+
+        def __enter__(self):
+            return self.__lines()
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            pass
+
+    def __init__(self):
+        Preprocessor.__init__(self, "m4-lite")
+
+    def call(self, file, spool = False):
+        return Preprocessor_m4lite._Wrapper(file)
+
 _preprocessors = {
-    'm4' :    Preprocessor_m4(),
-    'plain' : Preprocessor_plain()
+    'm4' :      Preprocessor_m4(),
+    'm4-lite' : Preprocessor_m4lite(),
+    'plain' :   Preprocessor_plain()
 }
 
+_token_cache = None
+_preprocessor_cache = None
+_preprocessor_jobs = 1
+_strict_indentation = False
+
+# (file, line) of the directive which is parsed; errors which are
+# detected later (e.g. while merging) report it
+_location = None
+
+def set_token_cache(cache):
+    global _token_cache
+    _token_cache = cache
+
+def set_preprocessor_cache(cache):
+    global _preprocessor_cache
+    _preprocessor_cache = cache
+
+# when enabled, the block of a directive is determined by its
+# indentation instead of trying the enclosing blocks
+def set_strict_indentation(ena):
+    global _strict_indentation
+    _strict_indentation = ena
+
+# returns the settings so that they can be passed to restore_settings()
+# in worker processes
+def save_settings():
+    return (_token_cache, _preprocessor_cache, _strict_indentation)
+
+def restore_settings(settings):
+    set_token_cache(settings[0])
+    set_preprocessor_cache(settings[1])
+    set_strict_indentation(settings[2])
+
+# sets the number of files which are preprocessed concurrently;
+# 0 uses the number of cpus
+def set_preprocessor_jobs(jobs):
+    global _preprocessor_jobs
+
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+
+    _preprocessor_jobs = jobs
+
+# Parsers are registered per class by listing them in '_PARSERS'; they
+# are instantiated for the object which handles a directive only while
+# it is parsed.
 class Parser(metaclass=abc.ABCMeta):
+    __slots__ = ('o',)
+
+    # maps the handled tags to their number of arguments; this is either
+    # an integer or a [min, max] pair where -1 means 'unlimited'
+    ARG_RANGES = {}
+
     def __init__(self, obj):
         self.o = obj
 
@@ -69,107 +331,241 @@ class Parser(metaclass=abc.ABCMeta):
     def _parse(self, l, enabled):
         pass
 
-    @abc.abstractmethod
-    def _validate(self, l):
-        pass
-
     @staticmethod
-    def _validate_ranges(l, ranges):
-        r = ranges.get(l[0])
-        if r == None:
-            return False
-
-        cnt = len(l) - 1
-
+    def _get_range(r):
         if isinstance(r, int):
-            min = r
-            max = r
+            return (r, r)
         else:
-            min = r[0]
-            max = r[1]
+            return (r[0], r[1])
+
+    @staticmethod
+    def _check_range(l, min, max):
+        cnt = len(l) - 1
 
         if ((min != -1 and cnt < min) or
             (max != -1 and cnt > max)):
                 raise Exception("Bad number of arguments in '%s'" % (l,))
 
-        return True
-
 class MultiParser(metaclass=abc.ABCMeta):
-    def __init__(self):
-        self._parsers = []
+    __slots__ = ()
 
-    def add_parser(self, parser):
-        assert(isinstance(parser, Parser))
-        self._parsers.append(parser)
+    # parser classes which are defined by this class (not by its bases)
+    _PARSERS = ()
+
+    # '_dispatch' maps tags to (parser class, min args, max args) tuples;
+    # every class has its own table which is created from the '_PARSERS'
+    # of the class and its bases.  It is looked up in the class '__dict__'
+    # only so that the table of a base class is never used by a subclass
+
+    def _get_dispatch(self):
+        cls = type(self)
+        res = cls.__dict__.get('_dispatch')
+        if res is not None:
+            return res
+
+        res = {}
+        for c in reversed(cls.__mro__):
+            for p in c.__dict__.get('_PARSERS', ()):
+                for (tag, r) in p.ARG_RANGES.items():
+                    if tag in res:
+                        raise Exception("INTERNAL ERROR: multiple parsers for '%s'"
+                                        % tag)
+
+                    res[tag] = (p,) + Parser._get_range(r)
+
+        cls._dispatch = res
+
+        return res
 
     @abc.abstractmethod
     def parse(self, l, enabled):
         pass
 
 class Block(MultiParser, metaclass=abc.ABCMeta):
+    __slots__ = ('__parent', '__is_valid', '__is_finalized', 'children',
+                 '__index')
+
     def __init__(self, parent, is_valid):
         assert(parent == None or isinstance(parent, Block))
 
-        MultiParser.__init__(self)
-
-        self.__i = 0
         self.__parent = parent
         self.__is_valid = is_valid
         self.__is_finalized = False
         self.children = []
 
+        # valid children by their index key; None until there is one
+        self.__index = None
+
     def is_valid(self):
         return self.__is_valid
 
-    def __read_file(self, input, defines, input_name = None):
+    # yields (lineno, Line) tuples for the complete logical lines of
+    # 'input'; the input is consumed lazily so that preprocessor output
+    # can be parsed while it is still being generated
+    @staticmethod
+    def _tokenize(input):
         from line import Line
 
-        l     = None
-        block = self
+        l      = None
         lineno = 0
 
-        if input_name is None:
-            input_name = input.name
-
-        for txt in input.readlines():
+        for txt in input:
             lineno = lineno + 1
             l = Line.parse(txt, l)
             if l.is_complete():
-                info  = l.expand(defines)
+                yield (lineno, l)
+                l = None
 
-                try:
-                    block = block.parse(info[2], info[0])
-                except:
-                    print("%s:%u failed to parse '%s'" %
-                          (input_name, lineno, l), file = sys.stderr)
-                    raise
+    @staticmethod
+    def _expand(lines, defines):
+        for (lineno, l) in lines:
+            yield (lineno, l, l.expand(defines))
 
-                if not block:
-                    raise Exception("failed to parse '%s'" % l)
+    # passes 'lines' through and calls 'fn' with the list of all lines
+    # once they were consumed completely
+    @staticmethod
+    def _record(lines, fn):
+        res = []
+        for l in lines:
+            res.append(l)
+            yield l
 
-                l = None
+        fn(res)
+
+    # parses 'l' within the innermost block of 'scopes' which was opened
+    # by a directive with a lower indentation than 'level'.  'scopes' is a
+    # stack of (level, block) tuples and is updated.
+    @staticmethod
+    def __parse_strict(scopes, l, level, enabled):
+        tag = l[0]
+
+        if not tag.startswith('@'):
+            raise Exception("Invalid line '%s'" % (l))
+
+        while scopes[-1][0] >= level:
+            scopes.pop()
+
+        blk = scopes[-1][1]
+
+        if tag == '@end':
+            # like other directives, '@end' is ignored when its condition
+            # does not match
+            if not enabled:
+                return blk
+
+            if len(scopes) == 1:
+                raise Exception("Unexpected '@end'")
+
+            scopes.pop()
+            return scopes[-1][1]
+
+        info = blk._get_dispatch().get(tag)
+        if not info:
+            raise Exception("Unexpected '%s' at indentation level %d" %
+                            (tag, level))
+
+        res = blk.__invoke(info, l, enabled)
+
+        if res is not blk:
+            scopes.append((level, res))
+
+        return res
+
+    def __read_file(self, lines, defines, input_name):
+        global _location
+
+        block  = self
+        scopes = [(-1, self)]
+        strict = _strict_indentation
+
+        for (lineno, l, info) in self._expand(lines, defines):
+            _location = (input_name, lineno)
+            try:
+                if strict:
+                    block = self.__parse_strict(scopes, info[2], info[1],
+                                                info[0])
+                else:
+                    block = block.parse(info[2], info[0])
+            except:
+                print("%s:%u failed to parse '%s'" %
+                      (input_name, lineno, l), file = sys.stderr)
+                raise
+
+            if not block:
+                raise Exception("failed to parse '%s'" % l)
 
         while block and block != self:
             #print(block)
             block = block.parse(['@end'], True)
 
 
-    def iterate_files(self, files, defines):
-        for f in files:
-            preproc=None
-            with open(f) as input:
-                l = input.readline()
-                if l.startswith('##!'):
-                    preproc = l[3:].strip().split()[0]
-
-            if preproc:
-                input_name = "[%s]%s" % (preproc, f)
-            else:
-                input_name = None
-                preproc = 'plain'
+    # detects the preprocessor of 'f' and either fetches its tokens from
+    # the cache or starts preprocessing it
+    @staticmethod
+    def __open_file(f, spool):
+        preproc=None
+        with open(f) as input:
+            l = input.readline()
+            if l.startswith('##!'):
+                preproc = l[3:].strip().split()[0]
+
+        if preproc:
+            input_name = "[%s]%s" % (preproc, f)
+        else:
+            input_name = f
+            preproc = 'plain'
+
+        pp    = _preprocessors[preproc]
+        lines = None
+        key   = None
+        input = None
+
+        if _token_cache and pp.is_cacheable():
+            (lines, key) = _token_cache.lookup(f, preproc)
+
+        if lines is None:
+            input = pp.call(f, spool)
+
+        return (input_name, lines, key, input)
 
-            with _preprocessors[preproc].call(f) as input:
-                self.__read_file(input, defines, input_name)
+    def __process_file(self, info, defines):
+        (input_name, lines, key, input) = info
+
+        if lines is not None:
+            self.__read_file(lines, defines, input_name)
+            return
+
+        cache = _token_cache
+
+        with input as stream:
+            lines = self._tokenize(stream)
+            if key:
+                lines = self._record(lines,
+                                     lambda x: cache.store(key, x))
+
+            self.__read_file(lines, defines, input_name)
+
+    def iterate_files(self, files, defines):
+        # up to 'jobs' files are preprocessed concurrently; they are
+        # parsed in the original order
+        jobs    = _preprocessor_jobs
+        pending = collections.deque()
+
+        try:
+            for f in files:
+                pending.append(self.__open_file(f, jobs > 1))
+                if len(pending) >= jobs:
+                    self.__process_file(pending.popleft(), defines)
+
+            while pending:
+                self.__process_file(pending.popleft(), defines)
+        finally:
+            # cleanup preprocessors which were started but not consumed
+            # due to an error
+            exc = sys.exc_info()
+            for (_, _, _, input) in pending:
+                if input:
+                    input.__exit__(*exc)
 
     def parse(self, l, enabled):
         if not l:
@@ -182,30 +578,61 @@ class Block(MultiParser, metaclass=abc.ABCMeta):
             raise Exception("Invalid line '%s'" % (l))
 
         if tag == '@end':
-            res = self.__parent
-        else:
-            res = None
-            for p in self._parsers:
-                if not p._validate(l):
-                    continue
+            return self.__parent
+
+        # when tag is not handled by this block, it implicitly ends it and
+        # the parent blocks are tried
+        blk = self
+        while blk:
+            info = blk._get_dispatch().get(tag)
+            if info:
+                return blk.__invoke(info, l, enabled)
+
+            blk = blk.__parent
 
-                res = p._parse(l, enabled)
-                assert(res != None)
+        return None
 
-            if not res:
-                p   = self.parse(['@end'], True)
+    def __invoke(self, info, l, enabled):
+        (parser, min, max) = info
+        Parser._check_range(l, min, max)
 
-                if p:
-                    res = p.parse(l, enabled)
+        res = parser(self)._parse(l, enabled)
 
         #print(res)
-        assert(res == None or isinstance(res, Block))
+        assert(res != None)
+        assert(isinstance(res, Block))
 
         return res
 
+    # returns the key of the object in the child index of its parent
+    # (e.g. the id of a register or the value of an enum); objects with
+    # key None are not indexed
+    def _get_index_key(self):
+        return None
+
+    # blocks have children of a single type (e.g. registers, fields or
+    # enums); the index maps their keys to the valid ones in the order
+    # they were added and detects duplicates when they are added.  It is
+    # an OrderedDict because plain dicts are unordered before Python 3.7
+    # and the order decides the emission order of equal sort keys.
     def add_child(self, child):
         self.children.append(child)
 
+        key = child._get_index_key()
+        if key is None or not child.is_valid():
+            return
+
+        if self.__index is None:
+            self.__index = collections.OrderedDict()
+        elif key in self.__index:
+            raise Exception("Duplicate object '%s'" % key)
+
+        self.__index[key] = child
+
+    # returns the child index; it must not be modified
+    def get_child_index(self):
+        return self.__index or {}
+
     def filter(self, fn):
         return filter(lambda r: fn(r) and r.is_valid(), self.children)
 
@@ -230,15 +657,13 @@ class Top(Block):
 
 class Mergeable(metaclass=abc.ABCMeta):
     class __Parser(Parser):
+        ARG_RANGES = {
+            '@use' : 1,
+        }
+
         def __init__(self, obj):
             super().__init__(obj)
 
-        def _validate(self, l):
-            ARG_RANGES = {
-                '@use' : 1,
-            }
-            return self._validate_ranges(l, ARG_RANGES)
-
         def _parse(self, l, enabled):
             tag = l[0]
             res = self.o
@@ -252,20 +677,71 @@ class Mergeable(metaclass=abc.ABCMeta):
 
             return res
 
-    def __init__(self):
-        self.add_parser(Mergeable.__Parser(self))
+    _PARSERS = (__Parser,)
+
+    # mixins can not have slots of their own; classes using them add
+    # these to their '__slots__'
+    __slots__ = ()
+    _SLOTS = ('_Mergeable__use', '_Mergeable__is_merged')
 
-        self.__use = []
+    def __init__(self):
+        # list of (id, location) tuples; None when there is no '@use'
+        self.__use = None
 
         self.__is_merged = False
-        self.__is_merging = False
 
     def _append_use(self, use):
-        self.__use.append(use)
+        if self.__use is None:
+            self.__use = []
+
+        self.__use.append((use, _location))
+
+    def get_use(self):
+        return [u for (u, _) in self.__use or ()]
+
+    def _get_use_count(self):
+        return len(self.__use) if self.__use else 0
+
+    def _get_use_id(self, idx):
+        return self.__use[idx][0]
+
+    # returns the base object for the idx-th '@use'
+    def _get_base(self, container, idx):
+        (id, loc) = self.__use[idx]
+        res = container.get(id)
+
+        if res is None:
+            raise Exception("%s: unknown base '%s'" %
+                            (Mergeable._format_location(loc), id))
+
+        assert(isinstance(res, Mergeable))
+
+        return res
+
+    # returns the objects of 'container' which are used by this one;
+    # reports unknown ones
+    def get_bases(self, container):
+        return [self._get_base(container, i)
+                for i in range(self._get_use_count())]
+
+    def _get_use_location(self, idx):
+        return Mergeable._format_location(self.__use[idx][1])
+
+    @staticmethod
+    def _format_location(loc):
+        if loc is None:
+            return "<unknown>"
+
+        return "%s:%u" % loc
 
     def is_merged(self):
         return self.__is_merged
 
+    # marks copies of merged objects (which do not have the children
+    # the merge worked on) as merged
+    def _set_merged(self):
+        self.__is_merged = True
+
     def _merge_pre(self):
         pass
 
@@ -276,41 +752,31 @@ class Mergeable(metaclass=abc.ABCMeta):
     def _merge_post(self):
         pass
 
-    def merge(self, container):
-        # check for circular deps
-        assert(not self.__is_merging)
-
-        # return when we are already merged
-        if self.__is_merged:
-            return
-
-        # set marker to avoid circular deps
-        self.__is_merging = True
-
-        # step 1: merge all base objects
-        for u in self.__use:
-            r = container[u]
-            assert(isinstance(r, Mergeable))
-            r.merge(container)
+    # merges the object with its bases; these must be merged already
+    def _merge_with_bases(self, container):
+        assert(not self.__is_merged)
 
-        # step 2: (optionally) prepare merge
+        # step 1: (optionally) prepare merge
         self._merge_pre()
 
-        # step 3: merge with bases
-        for u in self.__use:
-            r = container[u]
+        # step 2: merge with bases
+        for (u, _) in self.__use or ():
             self._merge(container[u])
 
-        # step 4: (optionally) execute post tasks
+        # step 3: (optionally) execute post tasks
         self._merge_post()
 
-        # (re)set flags and markers
-        self.__is_merging = False
-        self.__is_merged  = True
+        self.__is_merged = True
+
+    # merges this object and the objects it uses (directly or
+    # indirectly)
+    def merge(self, container):
+        if not self.__is_merged:
+            MergeScheduler(container, [self]).run()
 
     @staticmethod
     def create_container(objects, key_fn):
-        res = {}
+        res = collections.OrderedDict()
         for o in objects:
             id = key_fn(o)
             if id in res:
@@ -320,26 +786,110 @@ class Mergeable(metaclass=abc.ABCMeta):
 
         return res
 
+    # inheritable attributes are immutable values (strings, numbers,
+    # tuples or objects like 'Field.BitField'); they are shared instead
+    # of copied
     @staticmethod
     def update_attr(attr, default):
         #print(attr, default)
         if attr != None or default == None:
             return attr
         else:
-            return copy.deepcopy(default)
+            return default
+
+# Orders the merging of Mergeable objects of 'container' (all of them
+# or the given 'objects' and the objects they use) by their '@use'
+# dependencies.  Objects are grouped into levels; an object uses only
+# objects of lower levels or objects which are merged already.  Hence,
+# objects of the same level do not depend on each other and can be
+# merged in any order.
+class MergeScheduler:
+    def __init__(self, container, objects = None):
+        if objects is None:
+            objects = container.values()
+
+        self.__container = container
+        self.__levels = self.__schedule(objects)
+
+    def get_levels(self):
+        return self.__levels
+
+    def run(self):
+        for level in self.__levels:
+            for o in level:
+                o._merge_with_bases(self.__container)
+
+    # reports the cycle which is closed by the last '@use' of the
+    # topmost entry of 'stack'
+    @staticmethod
+    def __cycle_error(stack, base):
+        pos = [o for (o, _) in stack].index(base)
+        ids = []
+        for (o, idx) in stack[pos:]:
+            ids.append(o._get_use_id(idx - 1))
+
+        (o, idx) = stack[-1]
+        raise Exception("%s: circular '@use' dependency: %s" %
+                        (o._get_use_location(idx - 1),
+                         ' -> '.join([ids[-1]] + ids)))
+
+    # walks the dependencies depth-first without recursion; 'levels'
+    # maps id() of visited objects to their level and to None while
+    # their bases are visited
+    def __schedule(self, objects):
+        container = self.__container
+        levels    = {}
+        res       = []
+
+        for root in objects:
+            if root.is_merged() or id(root) in levels:
+                continue
+
+            levels[id(root)] = None
+            stack = [(root, 0)]
+
+            while stack:
+                (obj, idx) = stack[-1]
+
+                if idx < obj._get_use_count():
+                    stack[-1] = (obj, idx + 1)
+                    base = obj._get_base(container, idx)
+
+                    if base.is_merged():
+                        pass
+                    elif id(base) not in levels:
+                        levels[id(base)] = None
+                        stack.append((base, 0))
+                    elif levels[id(base)] is None:
+                        self.__cycle_error(stack, base)
+
+                    continue
+
+                stack.pop()
+
+                lvl = 0
+                for i in range(obj._get_use_count()):
+                    base = obj._get_base(container, i)
+                    if not base.is_merged():
+                        lvl = max(lvl, levels[id(base)] + 1)
+
+                levels[id(obj)] = lvl
+                while len(res) <= lvl:
+                    res.append([])
+
+                res[lvl].append(obj)
+
+        return res
 
 class Removable(metaclass=abc.ABCMeta):
     class __Parser(Parser):
+        ARG_RANGES = {
+            '@remove' : 0,
+        }
+
         def __init__(self, obj):
             super().__init__(obj)
 
-        def _validate(self, l):
-            ARG_RANGES = {
-                '@remove' : 0,
-            }
-
-            return self._validate_ranges(l, ARG_RANGES)
-
 
         def _parse(self, l, enabled):
             tag = l[0]
@@ -354,8 +904,12 @@ class Removable(metaclass=abc.ABCMeta):
 
             return res
 
+    _PARSERS = (__Parser,)
+
+    __slots__ = ()
+    _SLOTS = ('_Removable__is_removed',)
+
     def __init__(self, is_removed = False):
-        self.add_parser(Removable.__Parser(self))
         self.__is_removed = is_removed
 
     def _set_removed(self, rm):
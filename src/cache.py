@@ -0,0 +1,177 @@
+#! /usr/bin/python3
+
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import pickle
+import hashlib
+import tempfile
+
+class Cache:
+    # increment when the layout of cached objects changes
+    VERSION = 1
+
+    def __init__(self, directory, kind):
+        self.__dir = os.path.join(directory, kind)
+        os.makedirs(self.__dir, exist_ok = True)
+
+    @staticmethod
+    def digest(*parts):
+        h = hashlib.sha256()
+        for p in parts:
+            if isinstance(p, str):
+                p = p.encode('utf-8')
+            h.update(p)
+            h.update(b'\0')
+
+        return h.hexdigest()
+
+    @staticmethod
+    def file_digest(fname):
+        with open(fname, 'rb') as f:
+            return Cache.digest(f.read())
+
+    def _path(self, key):
+        return os.path.join(self.__dir, key)
+
+    def _load(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                res = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        if not isinstance(res, tuple) or res[0] != Cache.VERSION:
+            return None
+
+        return res[1:]
+
+    def _store(self, key, *data):
+        (fd, tmp) = tempfile.mkstemp(dir = self.__dir, prefix = '.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((Cache.VERSION,) + data, f,
+                            protocol = pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except:
+            os.unlink(tmp)
+            raise
+
+class TokenCache(Cache):
+    class _Key:
+        def __init__(self, fname, preproc, stat, digest):
+            self.fname   = fname
+            self.preproc = preproc
+            self.stat    = stat
+            self.digest  = digest
+
+    def __init__(self, directory):
+        Cache.__init__(self, directory, 'tokens')
+
+    @staticmethod
+    def __stat(fname):
+        st = os.stat(fname)
+        return (st.st_mtime_ns, st.st_size)
+
+    def __id(self, fname, preproc):
+        return self.digest(os.path.abspath(fname), preproc)
+
+    # returns a (lines, key) tuple; 'lines' is a list of (lineno, Line)
+    # tuples or None when there is no valid cache entry.  In the latter
+    # case, the tokenized lines should be passed to store() together
+    # with 'key'
+    def lookup(self, fname, preproc):
+        from line import Line
+
+        stat  = self.__stat(fname)
+        entry = self._load(self.__id(fname, preproc))
+
+        if entry and entry[0] == stat:
+            # fast path: unchanged mtime and size
+            digest = entry[1]
+        else:
+            digest = self.file_digest(fname)
+
+        key = TokenCache._Key(fname, preproc, stat, digest)
+
+        if not entry or entry[1] != digest:
+            return (None, key)
+
+        if entry[0] != stat:
+            # content unchanged but file was touched; refresh the entry
+            self._store(self.__id(fname, preproc), stat, digest, entry[2])
+
+        lines = [(lineno, Line.create(tokens, level))
+                 for (lineno, tokens, level) in entry[2]]
+
+        return (lines, key)
+
+    def store(self, key, lines):
+        tmp = [(lineno, l.tokens, l.get_level()) for (lineno, l) in lines]
+        self._store(self.__id(key.fname, key.preproc),
+                    key.stat, key.digest, tmp)
+
+class PreprocessorCache(Cache):
+    class _Key:
+        def __init__(self, id, digest):
+            self.id     = id
+            self.digest = digest
+
+    def __init__(self, directory, kind):
+        Cache.__init__(self, directory, kind)
+        self.__digests = {}
+
+    # like Cache.file_digest() but memoized by mtime and size; include
+    # files are usually shared by lots of description files.  Returns
+    # None when file does not exist
+    def __file_digest(self, fname):
+        try:
+            st = os.stat(fname)
+        except FileNotFoundError:
+            return None
+
+        stat = (fname, st.st_mtime_ns, st.st_size)
+        res  = self.__digests.get(stat)
+        if res is None:
+            res = self.file_digest(fname)
+            self.__digests[stat] = res
+
+        return res
+
+    # returns a (text, key) tuple; 'text' is the cached output of the
+    # preprocessor or None when there is no valid cache entry.  'tool'
+    # is a list of strings which identifies the preprocessor (program
+    # version, commandline).
+    def lookup(self, fname, tool):
+        id     = self.digest(os.path.abspath(fname), *tool)
+        digest = self.__file_digest(fname)
+        entry  = self._load(id)
+        key    = PreprocessorCache._Key(id, digest)
+
+        if not entry or entry[0] != digest:
+            return (None, key)
+
+        for (dep, dep_digest) in entry[1]:
+            if self.__file_digest(dep) != dep_digest:
+                return (None, key)
+
+        return (entry[2], key)
+
+    # 'deps' is the list of files which were read by the preprocessor
+    # besides the main file.  It can contain files which do not exist;
+    # the entry is invalidated when they are created.
+    def store(self, key, text, deps):
+        deps = [(d, self.__file_digest(d)) for d in deps]
+        self._store(key.id, key.digest, deps, text)
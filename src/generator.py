@@ -15,6 +15,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import abc
+import functools
 
 class CodeObject(metaclass=abc.ABCMeta):
     TABSIZE	=  8
@@ -30,14 +31,24 @@ class CodeObject(metaclass=abc.ABCMeta):
     def emit(self, lvl = 0, print_comment = True):
         pass
 
-    @staticmethod
-    def _append(a, b):
-        if a == None:
-            return b
-        elif b == None:
-            return a
-        else:
-            return a + b
+    # passes the emitted fragments to 'write' instead of returning them
+    # as a single object; objects with children override this to avoid
+    # concatenating their output
+    def emit_to(self, write, lvl = 0, print_comment = True):
+        res = self.emit(lvl, print_comment)
+        if res != None:
+            write(res)
+
+    # emits the object by collecting the fragments and joining them
+    # once; returns None when there are no fragments
+    def _emit_joined(self, lvl, print_comment):
+        res = []
+        self.emit_to(res.append, lvl, print_comment)
+
+        if not res:
+            return None
+
+        return res[0][:0].join(res)
 
     @staticmethod
     def indent_line(level):
@@ -126,12 +137,16 @@ class CodeBlock(CodeObject):
         else:
             self.__top	= self
 
-    def __getattr__(self, *args):
+    def __getattr__(self, name):
+        return CodeBlock.__Wrap(self._get_factory_method(name), self)
+
+    # returns the method 'name' of the factory; unlike attribute lookups,
+    # results of calling it are not added to the block
+    def _get_factory_method(self, name):
         if self.__top == None:
-            raise AttributeError(args)
+            raise AttributeError(name)
 
-        o = self.__top._redirect(*args)
-        return CodeBlock.__Wrap(o, self)
+        return self.__top._redirect(name)
 
     @abc.abstractmethod
     def _emit_pre(self, lvl, print_comment):
@@ -142,20 +157,26 @@ class CodeBlock(CodeObject):
         pass
 
     def add(self, o):
-        if o != None:
+        if o is not None:
             assert(isinstance(o, CodeObject))
             self.__objects.append(o)
 
         return self
 
     def emit(self, lvl = 0, print_comment = True):
+        return self._emit_joined(lvl, print_comment)
+
+    def emit_to(self, write, lvl = 0, print_comment = True):
         res = self._emit_pre(lvl, print_comment)
-        for o in self.__objects:
-            res = self._append(res, o.emit(lvl + 1, print_comment))
+        if res != None:
+            write(res)
 
-        res = self._append(res, self._emit_post(lvl, print_comment))
+        for o in self.__objects:
+            o.emit_to(write, lvl + 1, print_comment)
 
-        return res
+        res = self._emit_post(lvl, print_comment)
+        if res != None:
+            write(res)
 
     def create_block(self, comment):
         o = self.__top._create_block(self, comment)
@@ -185,11 +206,11 @@ class CodeFactory(metaclass=abc.ABCMeta):
             self.__a = a
 
         def emit(self, lvl = 0, print_comment = True):
-            res = None
-            for e in self.__a:
-                res = self._append(res, e.emit(lvl, print_comment))
+            return self._emit_joined(lvl, print_comment)
 
-            return res
+        def emit_to(self, write, lvl = 0, print_comment = True):
+            for e in self.__a:
+                e.emit_to(write, lvl, print_comment)
 
     @abc.abstractmethod
     def add_symbol(self, symbol):
@@ -278,12 +299,15 @@ class CodeGenerator(CodeBlock):
     def _emit_post(self, lvl, print_comment):
         pass
 
-    def _redirect(self, *args, **kwargs):
-        return self.__factory.__getattribute__(*args, **kwargs)
+    def _redirect(self, name):
+        return getattr(self.__factory, name)
 
     def emit(self, lvl = -1, print_comment = True):
         return CodeBlock.emit(self, lvl, print_comment)
 
+    def emit_to(self, write, lvl = -1, print_comment = True):
+        CodeBlock.emit_to(self, write, lvl, print_comment)
+
     def _create_block(self, parent, comment):
         assert(isinstance(parent, CodeBlock))
         assert(comment == None or isinstance(comment, str))
@@ -297,6 +321,70 @@ class CodeGenerator(CodeBlock):
         self.__existing.add(symbol)
         return False
 
+# Forwards each call to a list of code blocks, e.g. the top blocks of
+# several CodeGenerators.  This allows to create several outputs by a
+# single walk over the model.  Calls which return code blocks (like
+# 'create_block()') return a MultiCodeBlock of them.  Objects which are
+# added by factory methods (like 'add_u8()') differ between the outputs
+# and are not returned.  Other calls (like 'add_and_test_existing()')
+# must return the same result for every block; this result is returned
+# once so that it can be tested like the result of a single call.
+class MultiCodeBlock:
+    def __init__(self, blocks, methods = None):
+        assert(len(blocks) > 0)
+
+        if methods is None:
+            methods = {}
+
+        self.__blocks = blocks
+        # name -> factory methods for 'blocks'; shared with the blocks
+        # created from this one because they belong to the same factories
+        self.__methods = methods
+
+    def __wrap_blocks(self, name, res):
+        cnt = len([o for o in res if isinstance(o, CodeBlock)])
+        if cnt == 0:
+            return None
+        elif cnt != len(res):
+            raise Exception("INTERNAL ERROR: '%s' did not create a block "
+                            "for every output" % name)
+
+        return MultiCodeBlock(res, self.__methods)
+
+    def __call_factories(self, name, fns, *args, **kwargs):
+        res = []
+        for (b, fn) in zip(self.__blocks, fns):
+            o = fn(*args, **kwargs)
+            b.add(o)
+            res.append(o)
+
+        return self.__wrap_blocks(name, res)
+
+    def __call_blocks(self, name, *args, **kwargs):
+        res = [getattr(b, name)(*args, **kwargs) for b in self.__blocks]
+
+        if any(map(lambda o: isinstance(o, CodeBlock), res)):
+            return self.__wrap_blocks(name, res)
+
+        if any(map(lambda o: o != res[0], res)):
+            raise Exception("INTERNAL ERROR: '%s' returned different "
+                            "results for the outputs" % name)
+
+        return res[0]
+
+    def __getattr__(self, name):
+        fns = self.__methods.get(name)
+        if fns is None:
+            if all(map(lambda b: hasattr(type(b), name), self.__blocks)):
+                return functools.partial(self.__call_blocks, name)
+
+            # like CodeBlock.__getattr__ but without an intermediate
+            # wrapper per block and call
+            fns = [b._get_factory_method(name) for b in self.__blocks]
+            self.__methods[name] = fns
+
+        return functools.partial(self.__call_factories, name, fns)
+
 def _test(factory):
     top = CodeGenerator(factory)
 
@@ -14,18 +14,22 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import re
+
 class Line:
-    class __IndentLevel:
-        def __init__(self):
-            self.i = 0
-
-        def inc(self, c):
-            if c == ' ':
-                self.i += 1
-            elif c == '\t':
-                self.i = (self.i + 8) / 8 * 8
-            else:
-                raise Exception("Bad char for indentation")
+    __ST_SPACE  = 1
+    __ST_WORD   = 2
+    __ST_QUOTED = 3
+
+    __RE_SPACE  = re.compile(r'[ \t]*')
+    __RE_WORD   = re.compile(r'[^ \t\'"#\\]+')
+    __RE_QUOTED = {
+        "'" : re.compile(r"[^'\\]*"),
+        '"' : re.compile(r'[^"\\]*'),
+    }
+
+    __RE_COND   = re.compile(r'[!&|()]|[^!&|()]+')
+    __selectors = {}
 
     def __init__(self):
         self.__is_complete = False
@@ -44,6 +48,16 @@ class Line:
     def is_complete(self):
         return self.__is_complete
 
+    def get_level(self):
+        return self.__level
+
+    @staticmethod
+    def create(tokens, level):
+        res = Line()
+        res.tokens = tokens
+        res.__set_complete(True, level)
+        return res
+
     def __add_token(self, tk, exp_quote = None):
         if self.__exp_quote:
             self.tokens[-1] += tk
@@ -59,34 +73,116 @@ class Line:
             self.__level = level
         self.__is_complete = is_complete
 
-    def expand(self, defines):
-        assert(self.is_complete())
+    # compiles the condition of a '[...]' selector into a predicate
+    # which is called with the set of defined symbols.  Conditions are
+    # symbols which can be negated by '!' and combined by '&' and '|'
+    # ('&' binds stronger); parentheses can be used for grouping.
+    @staticmethod
+    def __compile_condition(cond):
+        tokens = Line.__RE_COND.findall(cond)
+        pos    = 0
 
-        if not self.tokens:
-            return (False, -1, None)
+        def peek():
+            if pos < len(tokens):
+                return tokens[pos]
+            return None
 
-        res = self.tokens[:]
-        f   = res[0]
-        idx = f.find('[')
-        valid = idx < 0
+        def expr():
+            nonlocal pos
+
+            res = [term()]
+            while peek() == '|':
+                pos += 1
+                res.append(term())
+
+            if len(res) == 1:
+                return res[0]
+
+            return lambda d: any(p(d) for p in res)
 
+        def term():
+            nonlocal pos
+
+            res = [factor()]
+            while peek() == '&':
+                pos += 1
+                res.append(factor())
+
+            if len(res) == 1:
+                return res[0]
+
+            return lambda d: all(p(d) for p in res)
+
+        def factor():
+            nonlocal pos
+
+            tk   = peek()
+            pos += 1
+
+            if tk == '!':
+                p = factor()
+                return lambda d: not p(d)
+            elif tk == '(':
+                p = expr()
+                if peek() != ')':
+                    raise ValueError()
+                pos += 1
+                return p
+            elif tk in [None, ')', '&', '|']:
+                raise ValueError()
+            else:
+                sym = tk.strip()
+                if not sym or '[' in sym or ']' in sym:
+                    raise ValueError()
+
+                return lambda d: sym in d
+
+        res = expr()
+        if pos != len(tokens):
+            raise ValueError()
+
+        return res
+
+    # splits the first token into the tag and the predicate of its
+    # condition (None when unconditional); results are memoized
+    def __get_selector(self):
+        tk  = self.tokens[0]
+        res = Line.__selectors.get(tk)
+        if res is not None:
+            return res
+
+        idx = tk.find('[')
         if idx < 0:
-            valid = True
+            res = (tk, None)
         else:
-            res[0] = f[:idx]
-            f = f[idx+1:]
+            try:
+                if not tk.endswith(']'):
+                    raise ValueError()
 
-            idx = f.index(']')
-            if f[idx:] != ']':
+                res = (tk[:idx], self.__compile_condition(tk[idx+1:-1]))
+            except ValueError:
                 raise Exception("Invalid condition in '%s'" % (self.tokens,))
 
-            f = f[:idx]
-            if f[0] == '!':
-                valid = f not in defines
-            else:
-                valid = f in defines
+        Line.__selectors[tk] = res
 
-        return (valid, self.__level, res)
+        return res
+
+    # 'defines' should be a set (or frozenset) of the defined symbols
+    def expand(self, defines):
+        assert(self.is_complete())
+
+        if not self.tokens:
+            return (False, -1, None)
+
+        (tag, cond) = self.__get_selector()
+
+        if cond is None:
+            return (True, self.__level, self.tokens)
+
+        res = self.tokens[:]
+        res[0] = tag
+
+        return (cond(defines), self.__level, res)
 
     @staticmethod
     def parse(l, prev_line):
@@ -94,145 +190,132 @@ class Line:
         if not res:
             res = Line()
 
-        end_quote = None
-
         l = l.rstrip('\n\r')
+        n = len(l)
+
+        if n == 0:
+            return res
 
-        #print("== >%s<" % l)
-        l = list(l)
-        if not l:
-            state = -1
+        quote    = res.get_expected_quote()
+        level    = 0
+        complete = True
+        tmp      = ''
+        p        = 0
+
+        if quote:
+            state = Line.__ST_QUOTED
         else:
-            end_quote = res.get_expected_quote()
-            if end_quote:
-                tmp   = ''
-                state = 22
-            else:
-                tmp = None
-                state = 0
-
-            c = l.pop(0)
-
-        indent_lvl = Line.__IndentLevel()
-        while state != -1:
-            if state == 0:
-                # start of line
-                if not l:
-                    state = 99
-                elif c in [' ', '\t']:
-                    indent_lvl.inc(c)
-                    c = l.pop(0)
-                elif c in ['#']:
-                    c = l.pop(0)
-                    state = 1
-                else:
-                    state = 2
-            elif state == 1:
-                # comment
-                if len(l) > 0 and l[-1] == '\\':
-                    state = 98
-                else:
-                    state = 99
-            elif state == 2:
-                # normal input; check EOL condition
-                if l:
-                    state = 4
+            # start of line; the last character is never interpreted here
+            while p < n - 1 and l[p] in ' \t':
+                if l[p] == ' ':
+                    level += 1
                 else:
-                    state = 99
-            elif state == 4:
-                # post state 2; initialize
-                assert(l)
+                    level = (level + 8) // 8 * 8
+                p += 1
+
+            if p == n - 1:
+                state = None
+            elif l[p] == '#':
+                complete = not (p + 2 < n and l[-1] == '\\')
+                state = None
+            else:
+                state = Line.__ST_SPACE
+
+        while state != None:
+            if state == Line.__ST_SPACE:
+                # whitespace (or list separator) between tokens
+                p = Line.__RE_SPACE.match(l, p).end()
                 tmp = ''
-                end_quote = None
-                state = 21
-            elif state == 3:
-                # normal input; continue token
-                if l:
-                    c = l.pop(0)
-                    state = 20
+
+                if p == n:
+                    state = None
+                elif l[p] != ',':
+                    state = Line.__ST_WORD
                 else:
+                    if res.open_list:
+                        res.__add_token('')
+
+                    res.open_list = True
+
+                    p += 1
+                    if p == n:
+                        state = None
+
+            elif state == Line.__ST_WORD:
+                # normal (unquoted) input
+                m = Line.__RE_WORD.match(l, p)
+                if m:
+                    tmp += m.group()
+                    p    = m.end()
+
+                if p == n:
                     res.__add_token(tmp)
-                    tmp = None
-                    state = 99
-            elif state == 20:
-                # normal input; process
-                if c in [' ', '\t']:
-                    # whitespace input
+                    state = None
+                    continue
+
+                c = l[p]
+                if c in ' \t':
                     res.__add_token(tmp)
-                    state = 2
-                elif c in ["'", '"']:
-                    # quoted input
-                    end_quote = c
-                    state = 22
-                    c     = l.pop(0)
+                    if p + 1 == n:
+                        state = None
+                    else:
+                        state = Line.__ST_SPACE
+                elif c in '\'"':
+                    quote = c
+                    p    += 1
+                    if p == n:
+                        raise Exception("Unterminated quote in '%s'" % l)
+                    state = Line.__ST_QUOTED
                 elif c == '#':
-                    state = 1
-                elif c != '\\':
-                    # normal (non-backslashified) input
-                    tmp  += c
-                    state = 3
-                elif l:
+                    # inline comment; pending token is discarded
+                    complete = not (p + 1 < n and l[-1] == '\\')
+                    state = None
+                elif p + 1 < n:
                     # backslashified input within line
-                    tmp  += l.pop(0)
-                    state = 3
+                    tmp += l[p + 1]
+                    p   += 2
+                    if p == n:
+                        res.__add_token(tmp)
+                        state = None
                 else:
                     # backslash at end of line
-                    state = 98
-            elif state == 21:
-                # whitespace in normal input
-                if c == ',':
-                    state = 24
-                elif c not in [' ', '\t']:
-                    state = 20
-                elif l:
-                    c = l.pop(0)
-                else:
-                    state = 99
-            elif state == 22:
-                # quoted input
-                assert(end_quote)
-                if c == end_quote:
+                    complete = False
+                    state = None
+
+            elif state == Line.__ST_QUOTED:
+                m    = Line.__RE_QUOTED[quote].match(l, p)
+                tmp += m.group()
+                p    = m.end()
+
+                if p == n:
+                    raise Exception("Unterminated quote in '%s'" % l)
+
+                if l[p] == quote:
                     res.__add_token(tmp)
-                    state = 23
-                elif c != '\\':
-                    tmp += c
-                    c = l.pop(0)
-                elif l:
-                    tmp += l.pop(0)
-                    c = l.pop(0)
-                else:
-                    res.__add_token(tmp, end_quote)
-                    state = 98
-            elif state == 23:
-                # end_quote has been read; fetch next char
-                if l:
-                    c = l.pop(0)
-                state = 2
-            elif state == 24:
-                # comma ',' between eleemnts
-                if res.open_list:
-                    res.__add_token('')
-
-                res.open_list = True
-
-                if l:
-                    c = l.pop(0)
-                    state = 21
+                    quote = None
+
+                    # the character directly following the quote is
+                    # dropped when it ends the line
+                    if p + 2 >= n:
+                        state = None
+                    else:
+                        p    += 1
+                        state = Line.__ST_SPACE
+                elif p + 1 < n:
+                    # backslashified input within quotes
+                    tmp += l[p + 1]
+                    p   += 2
+                    if p == n:
+                        raise Exception("Unterminated quote in '%s'" % l)
                 else:
-                    state = 99
-            elif state == 98:
-                # backslashified line
-                res.__set_complete(False, indent_lvl.i)
-                state = -1
-            elif state == 99:
-                res.__set_complete(True, indent_lvl.i)
-                state = -1
-            else:
-                raise Exception("Unsupported state %d" % state)
+                    # backslash at end of line; quote continues in next one
+                    res.__add_token(tmp, quote)
+                    complete = False
+                    state = None
 
-            #print(state, tmp, c)
+        res.__set_complete(complete, level)
 
-        if res and res.is_complete() and not res.tokens:
+        if res.is_complete() and not res.tokens:
             res = Line()
 
         return res
@@ -0,0 +1,433 @@
+#! /usr/bin/python3
+
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# In-process implementation of the subset of GNU m4 (as run by
+# 'm4 -E -Q -P') which is used by description files: 'm4_define',
+# 'm4_pushdef', 'm4_popdef', 'm4_undefine', 'm4_ifelse', 'm4_shift',
+# 'm4_include', 'm4_divert' (to 0 or discarding diversions only) and
+# 'm4_dnl'.  This covers the 'foreach' macro of 'cpudef.m4'.  Other
+# GNU builtins raise 'Unsupported' so that the caller can fall back to
+# the real m4.
+
+import os
+import re
+
+class Unsupported(Exception):
+    pass
+
+# GNU m4 builtins which are not implemented
+_UNSUPPORTED = frozenset(map(lambda x: 'm4_' + x, [
+    '__file__', '__gnu__', '__line__', '__program__', '__unix__',
+    'builtin', 'changecom', 'changequote', 'changeword', 'debugfile',
+    'debugmode', 'decr', 'defn', 'divnum', 'dumpdef', 'errprint',
+    'esyscmd', 'eval', 'format', 'ifdef', 'incr', 'index', 'indir', 'len',
+    'm4exit', 'm4wrap', 'maketemp', 'mkstemp', 'patsubst', 'regexp',
+    'sinclude', 'substr', 'syscmd', 'sysval', 'traceoff', 'traceon',
+    'translit', 'undivert',
+]))
+
+# builtins which are recognized only when called with arguments
+_NEED_ARGS = frozenset([
+    'm4_define', 'm4_pushdef', 'm4_popdef', 'm4_undefine', 'm4_ifelse',
+    'm4_shift', 'm4_include',
+])
+
+_WORD    = 0
+_QUOTE   = 1
+_COMMENT = 2
+_TEXT    = 3
+
+_RE_WORD  = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+_RE_TEXT  = re.compile(r"[^`#A-Za-z_(),]+")
+_RE_QUOTE = re.compile(r"[`']")
+_RE_SPACE = re.compile(r'\s*')
+_RE_ARG   = re.compile(r'\$([0-9]+|#|\*|@)')
+
+# content of included files; they are read only once per process
+# unless they change
+_includes = {}
+
+def _read_include(fname):
+    st  = os.stat(fname)
+    key = (st.st_mtime_ns, st.st_size)
+    res = _includes.get(fname)
+
+    if res is None or res[0] != key:
+        with open(fname) as f:
+            res = (key, f.read())
+
+        _includes[fname] = res
+
+    return res[1]
+
+def _quote(args):
+    return ','.join(map(lambda a: '`%s\'' % a, args))
+
+class Engine:
+    def __init__(self, fname):
+        self.__fname = fname
+        self.__include_dirs = [os.path.dirname(fname)]
+
+        # input stack of [text, pos, source] entries; 'source' is an
+        # iterator which provides more lines of a file or None for
+        # expansion text
+        self.__input = []
+        self.__output = []
+        self.__discard = False
+
+        self.__macros = {
+            'm4_define'   : [self.__define],
+            'm4_pushdef'  : [self.__pushdef],
+            'm4_popdef'   : [self.__popdef],
+            'm4_undefine' : [self.__undefine],
+            'm4_ifelse'   : [self.__ifelse],
+            'm4_shift'    : [self.__shift],
+            'm4_include'  : [self.__include],
+            'm4_divert'   : [self.__divert],
+            'm4_dnl'      : [self.__dnl],
+        }
+
+    # returns the input entry holding the next character; None at the
+    # end of input
+    def __top(self):
+        input = self.__input
+
+        while input:
+            top = input[-1]
+            if top[1] < len(top[0]):
+                return top
+
+            l = top[2] and next(top[2], None)
+            if l is not None:
+                top[0] = l
+                top[1] = 0
+            else:
+                input.pop()
+
+        return None
+
+    # appends more input to 'top' for tokens which span multiple lines
+    # or expansions; returns False at the end of input
+    def __more(self, top):
+        input = self.__input
+        rest  = top[0][top[1]:]
+
+        l = top[2] and next(top[2], None)
+        if l is not None:
+            top[0] = rest + l
+            top[1] = 0
+            return True
+
+        input.pop()
+
+        top = self.__top()
+        if top is None:
+            return False
+
+        top[0] = rest + top[0][top[1]:]
+        top[1] = 0
+
+        return True
+
+    def __push(self, text):
+        input = self.__input
+
+        # drop exhausted expansions; avoids growing the stack in tail
+        # recursive macros like '_foreach'
+        while input and not input[-1][2] and input[-1][1] >= len(input[-1][0]):
+            input.pop()
+
+        input.append([text, 0, None])
+
+    def __peek(self):
+        top = self.__top()
+        return top and top[0][top[1]]
+
+    def __read_quoted(self, top):
+        start = top[1]
+        pos   = start
+        depth = 0
+
+        while True:
+            text = top[0]
+            for m in _RE_QUOTE.finditer(text, pos):
+                if m.group() == '`':
+                    depth += 1
+                else:
+                    depth -= 1
+
+                if depth == 0:
+                    top[1] = m.end()
+                    return text[start + 1:m.start()]
+
+            pos = len(text) - start
+            if not self.__more(top):
+                raise Exception("%s: end of file in string" % self.__fname)
+
+            top   = self.__input[-1]
+            start = 0
+
+    def __read_comment(self, top):
+        while True:
+            i = top[0].find('\n', top[1])
+            if i >= 0:
+                res = top[0][top[1]:i + 1]
+                top[1] = i + 1
+                return res
+
+            if not self.__more(top):
+                raise Exception("%s: end of file in comment" % self.__fname)
+
+            top = self.__input[-1]
+
+    def __skip_space(self):
+        while True:
+            top = self.__top()
+            if top is None:
+                return
+
+            top[1] = _RE_SPACE.match(top[0], top[1]).end()
+            if top[1] < len(top[0]):
+                return
+
+    def __next_token(self):
+        top = self.__top()
+        if top is None:
+            return (None, None)
+
+        (text, pos) = top[0:2]
+        c = text[pos]
+
+        if c == '`':
+            return (_QUOTE, self.__read_quoted(top))
+        elif c == '#':
+            return (_COMMENT, self.__read_comment(top))
+        elif c in '(),':
+            top[1] = pos + 1
+            return (c, c)
+
+        m = _RE_WORD.match(text, pos)
+        if m:
+            # words continue into the input following an expansion
+            while m.end() == len(top[0]) and self.__more(top):
+                top = self.__input[-1]
+                m = _RE_WORD.match(top[0], top[1])
+
+            top[1] = m.end()
+            return (_WORD, m.group())
+
+        m = _RE_TEXT.match(text, pos)
+        top[1] = m.end()
+
+        return (_TEXT, m.group())
+
+    def __collect_args(self):
+        args  = []
+        arg   = []
+        depth = 0
+
+        # skip '('
+        self.__next_token()
+        self.__skip_space()
+
+        while True:
+            (kind, text) = self.__next_token()
+
+            if kind is None:
+                raise Exception("%s: end of file in argument list" %
+                                self.__fname)
+            elif depth == 0 and kind in (',', ')'):
+                args.append(''.join(arg))
+                arg = []
+
+                if kind == ')':
+                    return args
+
+                self.__skip_space()
+                continue
+            elif kind == '(':
+                depth += 1
+            elif kind == ')':
+                depth -= 1
+
+            self.__handle(kind, text, arg)
+
+    def __call(self, name, out):
+        defn = self.__macros[name][-1]
+
+        if self.__peek() == '(':
+            args = self.__collect_args()
+        else:
+            args = None
+
+        if isinstance(defn, str):
+            res = self.__substitute(name, defn, args or [])
+        elif args is None and name in _NEED_ARGS:
+            out.append(name)
+            res = None
+        else:
+            res = defn(args or [])
+
+        if res:
+            self.__push(res)
+
+    def __handle(self, kind, text, out):
+        if kind == _WORD:
+            if text in self.__macros:
+                self.__call(text, out)
+                return
+            elif text in _UNSUPPORTED:
+                raise Unsupported(text)
+
+        out.append(text)
+
+    @staticmethod
+    def __substitute(name, body, args):
+        def repl(m):
+            a = m.group(1)
+            if a == '#':
+                return str(len(args))
+            elif a == '*':
+                return ','.join(args)
+            elif a == '@':
+                return _quote(args)
+
+            idx = int(a)
+            if idx == 0:
+                return name
+            elif idx <= len(args):
+                return args[idx - 1]
+            else:
+                return ''
+
+        if '$' not in body:
+            return body
+
+        return _RE_ARG.sub(repl, body)
+
+    def __define(self, args):
+        stack = self.__macros.setdefault(args[0], [])
+        defn  = len(args) > 1 and args[1] or ''
+
+        if stack:
+            stack[-1] = defn
+        else:
+            stack.append(defn)
+
+    def __pushdef(self, args):
+        defn = len(args) > 1 and args[1] or ''
+        self.__macros.setdefault(args[0], []).append(defn)
+
+    def __popdef(self, args):
+        for a in args:
+            stack = self.__macros.get(a)
+            if stack:
+                stack.pop()
+                if not stack:
+                    del self.__macros[a]
+
+    def __undefine(self, args):
+        for a in args:
+            self.__macros.pop(a, None)
+
+    def __ifelse(self, args):
+        while len(args) >= 3:
+            if args[0] == args[1]:
+                return args[2]
+            elif len(args) == 3:
+                return None
+            elif len(args) <= 5:
+                return args[3]
+
+            args = args[3:]
+
+        return None
+
+    def __shift(self, args):
+        return _quote(args[1:])
+
+    def __include(self, args):
+        fname = args[0]
+
+        if not os.path.isabs(fname) and not os.path.exists(fname):
+            for d in self.__include_dirs:
+                if os.path.exists(os.path.join(d, fname)):
+                    fname = os.path.join(d, fname)
+                    break
+
+        try:
+            return _read_include(fname)
+        except OSError as e:
+            raise Exception("%s: cannot open '%s': %s" %
+                            (self.__fname, args[0], e.strerror))
+
+    def __divert(self, args):
+        try:
+            num = int(args and args[0] or '0')
+        except ValueError:
+            raise Unsupported("m4_divert(%s)" % args[0])
+
+        if num > 0:
+            raise Unsupported("m4_divert(%s)" % num)
+
+        self.__discard = num < 0
+
+    def __dnl(self, args):
+        while True:
+            top = self.__top()
+            if top is None:
+                # m4 fails on a missing newline; let it report this
+                raise Unsupported("m4_dnl at end of file")
+
+            i = top[0].find('\n', top[1])
+            if i >= 0:
+                top[1] = i + 1
+                return
+
+            top[1] = len(top[0])
+
+    # expands the file and yields the output line by line
+    def lines(self):
+        with open(self.__fname) as f:
+            self.__input.append(['', 0, iter(f)])
+
+            out = self.__output
+            while True:
+                (kind, text) = self.__next_token()
+                if kind is None:
+                    break
+
+                tmp = []
+                self.__handle(kind, text, tmp)
+
+                if self.__discard or not tmp:
+                    continue
+
+                out.extend(tmp)
+                if '\n' not in out[-1]:
+                    continue
+
+                data = ''.join(out)
+                pos  = data.rfind('\n') + 1
+
+                for l in data[:pos].split('\n')[:-1]:
+                    yield l + '\n'
+
+                out[:] = [data[pos:]]
+
+        rest = ''.join(out)
+        if rest:
+            yield rest
@@ -14,21 +14,21 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import sys
+import collections
+
 import block
 from generator import Symbol
 
 class Top(block.Top):
     class __Parser(block.Parser):
+        ARG_RANGES = {
+            '@pin' : 1,
+        }
+
         def __init__(self, obj):
             super().__init__(obj)
 
-        def _validate(self, l):
-            ARG_RANGES = {
-                '@pin' : 1,
-            }
-
-            return self._validate_ranges(l, ARG_RANGES)
-
         def _parse(self, l, enabled):
             tag = l[0]
             res = self.o
@@ -43,31 +43,26 @@ class Top(block.Top):
 
             return res
 
+    _PARSERS = (__Parser,)
+
     def __init__(self, bga):
         block.Top.__init__(self)
-        self.add_parser(Top.__Parser(self))
         self.bga = bga
 
     def merge(self):
-        tmp = block.Mergeable.create_container(self.children,
-                                               lambda x: x.get_id())
-        for p in tmp.values():
-            p.merge(tmp)
+        block.MergeScheduler(self.get_child_index()).run()
 
 class Pin(block.Block, block.Mergeable):
-    class BallInfo:
-        def __init__(self, ball, col, row):
-            self.ball = ball
-            self.col  = col
-            self.row  = row
+    # immutable; shared between pins which inherit them by '@use'
+    class BallInfo(collections.namedtuple('BallInfo', ['ball', 'col', 'row'])):
+        __slots__ = ()
 
         def __repr__(self):
             return '%s(%u,%u)' % (self.ball, self.col, self.row)
 
-    class PowerInfo:
-        def __init__(self, domain, is_consumer):
-            self.domain = domain
-            self.is_consumer = is_consumer
+    class PowerInfo(collections.namedtuple('PowerInfo',
+                                           ['domain', 'is_consumer'])):
+        __slots__ = ()
 
         def __repr__(self):
             if self.is_consumer:
@@ -160,21 +155,19 @@ class Pin(block.Block, block.Mergeable):
 
 
     class __Parser(block.Parser):
-        def __init__(self, obj):
-            super().__init__(obj)
+        ARG_RANGES = {
+            '@template' :  0,
+            '@name' :      1,
+            '@power' :     1,
+            '@reset,af' :  1,
+            '@reset,dir' : 1,
+            '@reset,val' : 1,
+            '@pad':        [1,3]
 
-        def _validate(self, l):
-            ARG_RANGES = {
-                '@template' :  0,
-                '@name' :      1,
-                '@power' :     1,
-                '@reset,af' :  1,
-                '@reset,dir' : 1,
-                '@reset,val' : 1,
-                '@pad':        [1,3]
+        }
 
-            }
-            return self._validate_ranges(l, ARG_RANGES)
+        def __init__(self, obj):
+            super().__init__(obj)
 
         def _parse(self, l, enabled):
             tag = l[0]
@@ -201,15 +194,19 @@ class Pin(block.Block, block.Mergeable):
 
             return res
 
+    _PARSERS = (__Parser,)
+
+    __slots__ = (block.Mergeable._SLOTS +
+                 ('__mux_field', '__mux_fn', '__id', '__title', '__pad',
+                  '__is_template', '__bga', '__power'))
+
     def __init__(self, top, name):
         block.Block.__init__(self, top, True)
         block.Mergeable.__init__(self)
 
-        self.add_parser(Pin.__Parser(self))
-
         self.__mux_field = None
         self.__mux_fn = {}
-        self.__id    = name
+        self.__id    = sys.intern(name)
         self.__title = None
         self.__pad   = None
         self.__is_template = False
@@ -267,6 +264,9 @@ class Pin(block.Block, block.Mergeable):
     def get_id(self):
         return self.__id
 
+    def _get_index_key(self):
+        return self.__id
+
     def get_title(self):
         if self.__title:
             return self.__title
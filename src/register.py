@@ -18,7 +18,7 @@ import os
 import sys
 import glob
 import copy
-import functools
+import collections
 
 import block
 import generator
@@ -29,6 +29,8 @@ class _NoPin:
     pass
 
 class Flags:
+    __slots__ = ('__v', '__dflt')
+
     def __init__(self, dflt = None):
         self.__v = None
         self.__dflt = dflt
@@ -48,16 +50,13 @@ class Flags:
 
 class Top(block.Top):
     class __Parser(block.Parser):
+        ARG_RANGES = {
+            '@register' : 1,
+        }
+
         def __init__(self, obj):
             super().__init__(obj)
 
-        def _validate(self, l):
-            ARG_RANGES = {
-                '@register' : 1,
-            }
-
-            return self._validate_ranges(l, ARG_RANGES)
-
         def _parse(self, l, enabled):
             tag = l[0]
             res = None
@@ -70,14 +69,15 @@ class Top(block.Top):
 
             return res
 
+    _PARSERS = (__Parser,)
+
     def __init__(self, unit):
         block.Top.__init__(self)
-        self.add_parser(Top.__Parser(self))
 
         self.__unit = unit
 
     def get_registers(self):
-        return self.filter(lambda f: isinstance(f, Register))
+        return self.get_child_index().values()
 
     def get_unit(self):
         return self.__unit
@@ -94,18 +94,15 @@ class Top(block.Top):
 
 class Enum(block.Block, block.Removable):
     class __Parser(block.Parser):
+        ARG_RANGES = {
+            '@name'    : 1,
+            '@seealso' : [1,-1],
+            "@pin,af"  : 1,
+        }
+
         def __init__(self, obj):
             super().__init__(obj)
 
-        def _validate(self, l):
-            ARG_RANGES = {
-                '@name'    : 1,
-                '@seealso' : [1,-1],
-                "@pin,af"  : 1,
-            }
-
-            return self._validate_ranges(l, ARG_RANGES)
-
         def _parse(self, l, enabled):
             tag = l[0]
             res = self.o
@@ -123,6 +120,10 @@ class Enum(block.Block, block.Removable):
 
             return res
 
+    _PARSERS = (__Parser,)
+
+    __slots__ = block.Removable._SLOTS + ('__value', '__name', '__field')
+
     def __init__(self, top, value, is_valid, is_removed = False):
         assert(isinstance(top, Field))
 
@@ -130,8 +131,6 @@ class Enum(block.Block, block.Removable):
         block.Block.__init__(self, top, is_valid)
         block.Removable.__init__(self, is_removed)
 
-        self.add_parser(Enum.__Parser(self))
-
         self.__value = value
         self.__name = None
         self.__field = top
@@ -141,7 +140,7 @@ class Enum(block.Block, block.Removable):
                                      self.is_removed())
 
     def _assign_name(self, name):
-        self.__name = name
+        self.__name = sys.intern(name)
 
     def _assign_af(self, af):
         reg = self.__field.get_register()
@@ -153,6 +152,9 @@ class Enum(block.Block, block.Removable):
     def get_value(self):
         return self.__value
 
+    def _get_index_key(self):
+        return self.__value
+
     def get_name(self):
         name = self.__name
         if not name:
@@ -203,43 +205,64 @@ class Field(block.Block, block.Mergeable, block.Removable):
     DISPLAY_DEC		= (2 << 2)
     DISPLAY_msk		= (7 << 2)
 
+    # immutable set of bit positions; it is shared between fields
+    # which inherit it by '@use'.  Mask, lowest bit and (for contiguous
+    # bits) the shift are computed once.
     class BitField:
-        def __init__(self, bits = None):
-            self.__v = None
-            self.__width = None
-
-            if bits:
-                self.set(bits)
-
-        def set_width(self, width):
-            assert(width != None)
-            assert(self.__width == None or self.__width == width)
+        __slots__ = ('__v', '__mask', '__min', '__shift', '__is_plain',
+                     '__groups', '__tables')
 
-            self.__width = width
+        # use lookup tables instead of shifting bit groups when a value
+        # would be split into more groups and enough values are
+        # converted at once
+        _MAX_GROUPS = 4
+        _MIN_TABLE_VALUES = 64
 
-        def set(self, bits):
-            if self.__v == None:
-                self.__v = []
+        def __init__(self, bits, prev = None):
+            v = []
+            if prev is not None:
+                v.extend(prev.__v)
 
-            splitted = []
             for b in bits:
-                tmp = b.split(',')
-                splitted.extend(tmp)
-
-            for b in splitted:
-                tmp = b.split('-')
-                if len(tmp) == 2:
-                    self.__set_range(int(tmp[0]), int(tmp[1]))
-                elif len(tmp) == 1:
-                    self.__set_range(int(tmp[0]), int(tmp[0]))
-                else:
-                    raise Exception("Invalid bitrange '%s'" % b)
-
-        def __set_range(self, a, b):
-            if a < b:
-                self.__v.extend(range(a, b+1, +1))
+                for r in b.split(','):
+                    tmp = r.split('-')
+                    if len(tmp) == 2:
+                        a = int(tmp[0])
+                        e = int(tmp[1])
+                    elif len(tmp) == 1:
+                        a = int(tmp[0])
+                        e = a
+                    else:
+                        raise Exception("Invalid bitrange '%s'" % r)
+
+                    if a < e:
+                        v.extend(range(a, e+1, +1))
+                    else:
+                        v.extend(range(a, e-1, -1))
+
+            msk = 0
+            for b in v:
+                msk |= (1 << b)
+
+            # no bit is given twice
+            assert(bin(msk).count('1') == len(v))
+
+            self.__v = tuple(v)
+            self.__mask = msk
+            self.__min = min(v) if v else -1
+
+            # contiguous bits which are given from the highest to the
+            # lowest one (e.g. '7-0') do not need a conversion of values
+            if v and msk == ((1 << len(v)) - 1) << self.__min:
+                self.__shift = self.__min
+                self.__is_plain = (v == list(range(self.__min + len(v) - 1,
+                                                   self.__min - 1, -1)))
             else:
-                self.__v.extend(range(a, b-1, -1))
+                self.__shift = None
+                self.__is_plain = False
+
+            self.__groups = None
+            self.__tables = None
 
         def __len__(self):
             return len(self.__v)
@@ -251,62 +274,149 @@ class Field(block.Block, block.Mergeable, block.Removable):
             return self.__v.__iter__()
 
         def __str__(self):
-            return "BITS <%x>: %s/%s" % (id(self), self.__v, self.__width)
+            return "BITS <%x>: %s" % (id(self), list(self.__v))
 
         def min(self):
-            if self.__v:
-                return min(self.__v)
-            else:
-                return -1
+            return self.__min
 
         def get_mask(self):
-            assert(self.__width != None)
-
-            res = 0
-            for b in self.__v:
-                assert((res & (1 << b)) == 0)
-                res |= (1 << b)
+            return self.__mask
 
-            return res
+        # number of bits; same as len() and the width of contiguous bits
+        def get_popcount(self):
+            return len(self.__v)
 
-        def generate_code(self, code, desc):
-            code.add_xint(self.get_mask(), self.__width,
-                          "%s %s/%s" % (desc, self.__v, self.__width))
+        def is_contiguous(self):
+            return self.__shift is not None
+
+        # returns the position of the lowest bit when the bits are
+        # contiguous; None else
+        def get_shift(self):
+            return self.__shift
+
+        # returns the position of every value bit in the converted
+        # value; see convert_values()
+        def __get_permutation(self):
+            n    = len(self.__v)
+            rank = {}
+            for (i, b) in enumerate(sorted(self.__v)):
+                rank[b] = i
+
+            return [n - 1 - rank[b] for b in self.__v]
+
+        # splits the permutation into runs of value bits which are moved
+        # by the same distance; returns (mask, left shift, right shift)
+        # tuples
+        def __get_groups(self):
+            if self.__groups is not None:
+                return self.__groups
+
+            runs = []
+            for (i, p) in enumerate(self.__get_permutation()):
+                if runs and runs[-1][2] == p - i:
+                    runs[-1][1] += 1
+                else:
+                    runs.append([i, 1, p - i])
+
+            res = []
+            for (pos, cnt, d) in runs:
+                res.append((((1 << cnt) - 1) << pos, max(d, 0), max(-d, 0)))
+
+            self.__groups = tuple(res)
+            return self.__groups
+
+        # returns a table for every byte of a value which maps the byte
+        # to its bits in the converted value
+        def __get_tables(self):
+            if self.__tables is not None:
+                return self.__tables
+
+            perm = self.__get_permutation()
+            res  = []
+            for pos in range(0, len(perm), 8):
+                bits = perm[pos:pos + 8]
+                tbl  = [0] * 256
+                for (k, p) in enumerate(bits):
+                    step = 1 << k
+                    for b in range(step, 256, 2 * step):
+                        for x in range(b, b + step):
+                            tbl[x] |= 1 << p
+
+                res.append(tbl)
+
+            self.__tables = tuple(res)
+            return self.__tables
+
+        # converts enum values, whose bit i is stored in the i-th given
+        # bit, to the value of these bits when they are read from the
+        # lowest to the highest one and packed into an integer with the
+        # lowest bit as most significant one
+        def convert_values(self, values):
+            lim = 1 << len(self.__v)
+            for v in values:
+                assert(0 <= v < lim)
+
+            if self.__is_plain:
+                return list(values)
+
+            groups = self.__get_groups()
+
+            if len(groups) == 1 and groups[0][1:] == (0, 0):
+                return list(values)
+
+            if (len(groups) > self._MAX_GROUPS and
+                len(values) >= self._MIN_TABLE_VALUES):
+                tables = self.__get_tables()
+                res    = []
+                for v in values:
+                    r = 0
+                    for t in tables:
+                        r |= t[v & 0xff]
+                        v >>= 8
+
+                    res.append(r)
+
+                return res
+
+            res = []
+            for v in values:
+                r = 0
+                for (m, l, s) in groups:
+                    r |= ((v & m) << l) >> s
+
+                res.append(r)
 
-        def __eq__(self, a):
-            if a == None:
-                return self.__v == a
+            return res
 
-            raise Exception("Unsupported comparision with %s" % a)
+        def generate_code(self, code, width, desc):
+            code.add_xint(self.__mask, width,
+                          "%s %s/%s" % (desc, list(self.__v), width))
 
     class __Parser(block.Parser):
+        ARG_RANGES = {
+            '@enum' : [1, 2],
+            '@description' : 1,
+            '@boolean' : [0, 1],
+            '@bits' : [1, -1],
+            '@frac' : 2,
+            '@integer' : 1,
+            '@uint' : 1,
+            '@sint' : 1,
+            '@signed' : 1,
+            '@reserved' : 0,
+            '@uhex' : 1,
+
+            "@ro" : 0,
+            "@read-only" : 0,
+            "@rw" : 0,
+            "@read-write" : 0,
+            "@wo" : 0,
+            "@write-only" : 0,
+        }
+
         def __init__(self, obj):
             super().__init__(obj)
 
-        def _validate(self, l):
-            ARG_RANGES = {
-                '@enum' : [1, 2],
-                '@description' : 1,
-                '@boolean' : [0, 1],
-                '@bits' : [1, -1],
-                '@frac' : 2,
-                '@integer' : 1,
-                '@uint' : 1,
-                '@sint' : 1,
-                '@signed' : 1,
-                '@reserved' : 0,
-                '@uhex' : 1,
-
-                "@ro" : 0,
-                "@read-only" : 0,
-                "@rw" : 0,
-                "@read-write" : 0,
-                "@wo" : 0,
-                "@write-only" : 0,
-            }
-
-            return self._validate_ranges(l, ARG_RANGES)
-
         def _parse(self, l, enabled):
             tag = l[0]
             res = self.o
@@ -354,6 +464,12 @@ class Field(block.Block, block.Mergeable, block.Removable):
 
             return res
 
+    _PARSERS = (__Parser,)
+
+    __slots__ = (block.Mergeable._SLOTS + block.Removable._SLOTS +
+                 ('__id', '__register', '__type', '__name', '__bits',
+                  '__width', '__desc', '__frac', '__flags'))
+
     def __init__(self, top, name, is_valid, is_removed = False):
         assert(isinstance(top, Register))
 
@@ -361,14 +477,13 @@ class Field(block.Block, block.Mergeable, block.Removable):
         block.Mergeable.__init__(self)
         block.Removable.__init__(self, is_removed)
 
-        self.add_parser(Field.__Parser(self))
-
-        self.__id   = name
+        self.__id   = sys.intern(name)
 
         self.__register = top
         self.__type = None
         self.__name = None
-        self.__bits = self.BitField()
+        self.__bits = None
+        self.__width = None
         self.__desc = None
         self.__frac = None
         self.__flags = Flags(self.ACCESS_READ | self.ACCESS_WRITE)
@@ -377,14 +492,19 @@ class Field(block.Block, block.Mergeable, block.Removable):
         return "FIELD <%x>: %s (on %s)" % (id(self), self.__id, self.__register)
 
     def clone(self, top):
-        res = Field(top, self.__id, self.is_valid)
+        res = Field(top, self.__id, self.is_valid())
         res.__type = self.__type
         res.__name = self.__name
         res.__bits = self.__bits
         res.__desc = self.__desc
         res.__frac = self.__frac
         res.__flags = self.__flags
-        res.children = self.children
+
+        # enums are modified when the field is updated; the ones of the
+        # original must not be touched
+        for e in self.children:
+            res.add_child(e.clone(res))
+
         return res
 
     def _assign_description(self, desc):
@@ -393,6 +513,9 @@ class Field(block.Block, block.Mergeable, block.Removable):
     def get_id(self):
         return self.__id
 
+    def _get_index_key(self):
+        return self.__id
+
     def get_register(self):
         return self.__register
 
@@ -403,15 +526,14 @@ class Field(block.Block, block.Mergeable, block.Removable):
             return self.get_id()
 
     def get_min_bit(self):
+        if self.__bits is None:
+            return -1
+
         return self.__bits.min()
 
     def get_bitmask(self):
         return self.__bits.get_mask()
 
-    @staticmethod
-    def cmp_by_bits(self, b):
-        return self.get_min_bit() - b.get_min_bit()
-
     def _set_type(self, type):
         assert(self.__type == type or self.__type == None)
         self.__type = type
@@ -434,8 +556,8 @@ class Field(block.Block, block.Mergeable, block.Removable):
         assert(self.__frac == None)
 
         self._set_type(Field.TYPE_FRAC)
-        self.__frac = [self.BitField([int_part,]),
-                       self.BitField([frac_part,])]
+        self.__frac = (self.BitField([int_part,]),
+                       self.BitField([frac_part,]))
 
     def _set_sint(self, part):
         assert(self.__bits == None)
@@ -450,12 +572,15 @@ class Field(block.Block, block.Mergeable, block.Removable):
         self.__bits = self.BitField([part,])
 
     def _set_bits(self, bits):
-        self.__bits.set(bits)
+        self.__bits = self.BitField(bits, self.__bits)
 
     def get_enums(self, all = False):
-        tmp = self.filter(lambda x: isinstance(x, Enum) and
-                          (all or not x.is_removed()))
-        return block.Mergeable.create_container(tmp, lambda x: x.get_value())
+        enums = self.get_child_index()
+        if all:
+            return enums
+
+        return collections.OrderedDict((v, e) for (v, e) in enums.items()
+                                       if not e.is_removed())
 
     def _set_flags(self, val, msk):
         self.__flags.set(val, msk)
@@ -477,7 +602,6 @@ class Field(block.Block, block.Mergeable, block.Removable):
     def update(self, other):
         assert(isinstance(other, Field))
         assert(not self.is_finalized())
-        assert(not other.is_finalized())
 
         self.__type = self.update_attr(self.__type, other.__type)
         self.__bits = self.update_attr(self.__bits, other.__bits)
@@ -502,34 +626,6 @@ class Field(block.Block, block.Mergeable, block.Removable):
         else:
             raise Exception("Unhandled type %d" % (self.__type))
 
-    def __convert_bits(self, v):
-        o_v = v
-        idx = 0
-        tmp = 0
-        msk = 0
-        for b in self.__bits:
-            assert((msk & (1 << b)) == 0)
-
-            tmp |= (v & 1) << b
-            msk |= (1 << b)
-            idx += 1
-            v  >>= 1
-
-        assert(v == 0)
-
-        res = 0
-        while msk != 0:
-            if msk & 1:
-                res <<= 1
-                res  |= tmp & 1
-            else:
-                assert((tmp & 1) == 0)
-
-            msk >>= 1
-            tmp >>= 1
-
-        return res
-
     def __generate_code_enum(self, top):
         assert(self.__type == self.TYPE_ENUM)
 
@@ -538,13 +634,14 @@ class Field(block.Block, block.Mergeable, block.Removable):
         top.add_type(symbol, None)
 
         code   = top.create_block('enum')
-        self.__bits.generate_code(code, "bitmask")
+        self.__bits.generate_code(code, self.__width, "bitmask")
 
-        if len(self.__bits) <= 8:
+        cnt = self.__bits.get_popcount()
+        if cnt <= 8:
             m = code.add_u8
-        elif len(self.__bits) <= 16:
+        elif cnt <= 16:
             m = code.add_u16
-        elif len(self.__bits) <= 32:
+        elif cnt <= 32:
             m = code.add_u32
         else:
             raise Exception("too much bits in enum")
@@ -553,8 +650,9 @@ class Field(block.Block, block.Mergeable, block.Removable):
 
         m(len(enums), "number of enums")
 
-        for e in enums:
-            v = self.__convert_bits(e.get_value())
+        values = self.__bits.convert_values([e.get_value() for e in enums])
+
+        for (e, v) in zip(enums, values):
             m(v,   "enum value")
             code.add_string(e.get_name(), "name")
 
@@ -579,8 +677,8 @@ class Field(block.Block, block.Mergeable, block.Removable):
 
         top.add_symbol(symbol)
         top.add_type(symbol, None)
-        self.__frac[0].generate_code(top, "integer part")
-        self.__frac[1].generate_code(top, "frac part")
+        self.__frac[0].generate_code(top, self.__width, "integer part")
+        self.__frac[1].generate_code(top, self.__width, "frac part")
 
         return top
 
@@ -591,7 +689,7 @@ class Field(block.Block, block.Mergeable, block.Removable):
 
         top.add_symbol(symbol)
         top.add_type(symbol, None)
-        self.__bits.generate_code(top, "sint")
+        self.__bits.generate_code(top, self.__width, "sint")
 
         return top
 
@@ -602,7 +700,7 @@ class Field(block.Block, block.Mergeable, block.Removable):
 
         top.add_symbol(symbol)
         top.add_type(symbol, None)
-        self.__bits.generate_code(top, "uint")
+        self.__bits.generate_code(top, self.__width, "uint")
 
         return top
 
@@ -667,13 +765,7 @@ class Field(block.Block, block.Mergeable, block.Removable):
         # TODO
 
     def _finalize(self):
-        w = self.__register.get_regwidth()
-
-        self.__bits.set_width(w)
-
-        if self.__frac:
-            self.__frac[0].set_width(w)
-            self.__frac[1].set_width(w)
+        self.__width = self.__register.get_regwidth()
 
 
 class Register(block.Block, block.Mergeable):
@@ -682,27 +774,24 @@ class Register(block.Block, block.Mergeable):
     ACCESS_msk		= (ACCESS_READ | ACCESS_WRITE)
 
     class __Parser(block.Parser):
+        ARG_RANGES = {
+            '@field' : 1,
+            '@template' : 0,
+            '@description' : 1,
+            '@addr' : [1, 2],
+            "@pin" : 1,
+
+            "@ro" : 0,
+            "@read-only" : 0,
+            "@rw" : 0,
+            "@read-write" : 0,
+            "@wo" : 0,
+            "@write-only" : 0,
+        }
+
         def __init__(self, obj):
             super().__init__(obj)
 
-        def _validate(self, l):
-            ARG_RANGES = {
-                '@field' : 1,
-                '@template' : 0,
-                '@description' : 1,
-                '@addr' : [1, 2],
-                "@pin" : 1,
-
-                "@ro" : 0,
-                "@read-only" : 0,
-                "@rw" : 0,
-                "@read-write" : 0,
-                "@wo" : 0,
-                "@write-only" : 0,
-            }
-
-            return self._validate_ranges(l, ARG_RANGES)
-
         def _parse(self, l, enabled):
             tag = l[0]
             res = self.o
@@ -742,6 +831,13 @@ class Register(block.Block, block.Mergeable):
 
             return res
 
+    _PARSERS = (__Parser,)
+
+    __slots__ = (block.Mergeable._SLOTS +
+                 ('__id', '__fq_id', '__unit', '__top', '__is_template',
+                  '__name', '__offs', '__width', '__fields', '__pin',
+                  '__flags', '__sorted_fields', '__reserved_msk'))
+
     def __init__(self, top, name, unit, is_valid):
         from unit import Unit
 
@@ -751,9 +847,8 @@ class Register(block.Block, block.Mergeable):
         block.Block.__init__(self, top, is_valid)
         block.Mergeable.__init__(self)
 
-        self.add_parser(Register.__Parser(self))
-
-        self.__id = name
+        self.__id = sys.intern(name)
+        self.__fq_id = None
         self.__unit = unit
         self.__top = top
 
@@ -762,10 +857,15 @@ class Register(block.Block, block.Mergeable):
         self.__offs = None
         self.__width = None
 
-        self.__fields = {}
+        self.__fields = collections.OrderedDict()
         self.__pin = None
         self.__flags = Flags(self.ACCESS_READ | self.ACCESS_WRITE)
 
+        # set by finalize(): non-reserved fields ordered by their lowest
+        # bit and the mask of the reserved ones
+        self.__sorted_fields = None
+        self.__reserved_msk = None
+
     def __str__(self):
         return "REG%s <%x>: %s (%s@%s, %08x/%s)" % (
             ["", "TMPL"][self.__is_template],
@@ -787,7 +887,7 @@ class Register(block.Block, block.Mergeable):
             self.__pin.add(num, fn, field)
 
     def update(self, other):
-        assert(isinstance(other, Unit))
+        assert(isinstance(other, Register))
 
         self.__is_template = self.update_attr(self.__is_template,
                                               other.__is_template)
@@ -817,6 +917,20 @@ class Register(block.Block, block.Mergeable):
 
         return res
 
+    # creates a copy of this merged register for 'unit'; fields are
+    # shared with the original
+    def instantiate(self, unit):
+        assert(self.is_merged())
+
+        res = self.clone(unit)
+        res.__fields = self.__fields
+        res.__flags = self.__flags
+        res.__sorted_fields = self.__sorted_fields
+        res.__reserved_msk = self.__reserved_msk
+        res._set_merged()
+
+        return res
+
     def _set_template(self, ena):
         self.__is_template = ena
 
@@ -834,21 +948,24 @@ class Register(block.Block, block.Mergeable):
     def get_offset(self):
         return self.__offs
 
-    @staticmethod
-    def cmp_by_addr(a, b):
-        return a.__offs - b.__offs
-
     def _set_address(self, offs, width):
         assert(self.__offs == None)
         self.__offs = offs
         self.__width = width
 
+    def _get_index_key(self):
+        return self.__id
+
     def get_id(self, fq = True):
-        if fq:
-            return self.__unit.get_id() + '_' + self.__id
-        else:
+        if not fq:
             return self.__id
 
+        # the unit of a register never changes
+        if self.__fq_id is None:
+            self.__fq_id = sys.intern(self.__unit.get_id() + '_' + self.__id)
+
+        return self.__fq_id
+
     def get_name(self):
         if self.__name != None:
             return self.__name
@@ -867,31 +984,45 @@ class Register(block.Block, block.Mergeable):
         assert(not self.is_finalized())
         assert(reg.is_finalized())
 
-        for f in reg.get_fields().values():
-            f  = f.clone(self)
-            id = f.get_id()
-            if id in self.__fields:
-                self.__fields[id].update(f)
-            else:
-                self.__fields[id] = f
-
         self.__is_template = self.update_attr(self.__is_template,
                                               reg.__is_template)
         self.__name  = self.update_attr(self.__name, reg.__name)
         self.__offs  = self.update_attr(self.__offs, reg.__offs)
         self.__width = self.update_attr(self.__width, reg.__width)
 
+        width = self.get_regwidth()
+
+        for f in reg.get_fields().values():
+            id = f.get_id()
+            if id in self.__fields:
+                self.__get_own_field(id).update(f)
+            elif (f.get_register().get_regwidth() == width and
+                  not f.is_removed()):
+                # finalized fields of the base are shared until they
+                # are modified
+                self.__fields[id] = f
+            else:
+                self.__fields[id] = f.clone(self)
+
         assert(reg.__pin == None)
 
+    # returns field 'id' for modification; a field which is shared with
+    # a base register is replaced by a copy first
+    def __get_own_field(self, id):
+        f = self.__fields[id]
+        if f.get_register() is not self:
+            f = f.clone(self)
+            self.__fields[id] = f
+
+        return f
+
     def _merge_pre(self):
         assert(not self.is_finalized())
 
-        fields = self.filter(lambda f: isinstance(f, Field))
-        fields = block.Mergeable.create_container(fields, lambda x: x.get_id())
+        # inherited fields are added to the copy
+        fields = collections.OrderedDict(self.get_child_index())
 
-        for f in fields.values():
-            assert(isinstance(f, block.Mergeable))
-            f.merge(fields)
+        block.MergeScheduler(fields).run()
 
         self.__fields = fields
 
@@ -902,6 +1033,22 @@ class Register(block.Block, block.Mergeable):
         for f in self.__fields.values():
             f.finalize()
 
+        if self.__sorted_fields is not None:
+            return
+
+        fields = []
+        msk    = 0
+        for f in self.__fields.values():
+            if f.is_reserved():
+                msk |= f.get_bitmask()
+            else:
+                fields.append(f)
+
+        fields.sort(key = Field.get_min_bit)
+
+        self.__sorted_fields = fields
+        self.__reserved_msk = msk
+
     def get_fields(self):
         return self.__fields
 
@@ -920,15 +1067,10 @@ class Register(block.Block, block.Mergeable):
         code.add_symbol(generator.Symbol("REGISTER_FLAG_ACCESS_WRITE",
                                          Register.ACCESS_WRITE, "write access"))
 
-        all_fields = list(self.__fields.values())
-
-        rfields  = filter(lambda x: x.is_reserved(), all_fields)
-        msk = 0
-        for f in rfields:
-            msk |= f.get_bitmask()
+        assert(self.is_finalized())
 
-        fields  = list(filter(lambda x: not x.is_reserved(), all_fields))
-        fields.sort(key = functools.cmp_to_key(lambda a, b: a.cmp_by_bits(a, b)))
+        fields = self.__sorted_fields
+        msk    = self.__reserved_msk
 
         cnt = len(fields)
         if msk != 0:
@@ -0,0 +1,288 @@
+#! /usr/bin/python3
+
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import glob
+import collections
+
+import block
+import unit
+
+# Holds the merged model of a description directory and remembers
+# which files contributed to which unit.  This allows to rebuild only
+# the units which are affected by changed files (and the units which
+# depend on them through '@use') instead of reading everything again.
+#
+# Each unit file is parsed into its own 'unit.Top' so that the units
+# defined by it can be replaced independently of the other files.
+# Merged units are never modified by merging other units, so that
+# unchanged units can be reused as bases of the rebuilt ones.  Register
+# files are parsed by a 'unit.RegisterCache' which is kept until the
+# next complete load.
+class Session:
+    def __init__(self, directory, defines, only = None, exclude = None,
+                 bga_file = None, jobs = 1):
+        self.__directory = directory
+        self.__defines = defines
+        self.__only = only
+        self.__exclude = exclude
+        self.__bga_file = bga_file
+        self.__jobs = jobs
+
+        self.__bga = None
+        self.__reg_cache = None
+        self.__units = {}       # unit id -> merged unit
+        self.__sorted_units = []
+        self.__addrmap = None
+        self.__unit_files = {}  # unit file -> ids of units defined there
+        self.__reg_files = {}   # unit id -> register files of the unit
+
+    def get_bga(self):
+        return self.__bga
+
+    # returns the enabled units, sorted by their address
+    def get_units(self):
+        return self.__sorted_units
+
+    def __set_units(self, units):
+        res = [u for u in units.values() if u.is_enabled()]
+        res.sort(key = unit.Unit.get_address)
+
+        self.__units = units
+        self.__sorted_units = res
+        self.__addrmap = None
+
+    # returns an 'addrmap.AddressMap' of the enabled units
+    def get_address_map(self):
+        if self.__addrmap is None:
+            import addrmap
+
+            self.__addrmap = addrmap.AddressMap(self.__sorted_units)
+
+        return self.__addrmap
+
+    def __find_unit_files(self):
+        res = []
+        for u in glob.glob(os.path.join(self.__directory, "*.unit")):
+            base = os.path.basename(u)[:-5]
+
+            if self.__exclude and (base in self.__exclude):
+                continue
+
+            if (not self.__only) or (base in self.__only):
+                res.append(u)
+
+        return res
+
+    def __read_bga(self):
+        if not self.__bga_file:
+            return None
+
+        import bga
+
+        res = bga.Top()
+        res.iterate_files([self.__bga_file,], self.__defines)
+        res.read_pins(self.__directory, self.__defines)
+        res.merge()
+
+        return res
+
+    def __read_unit_file(self, f):
+        top = unit.Top(self.__bga)
+        top.iterate_files([f,], self.__defines)
+
+        return list(top.get_units())
+
+    def __read_registers(self, units):
+        if self.__bga:
+            for u in units:
+                u.read_registers(self.__directory, self.__defines)
+        else:
+            self.__reg_cache.read(units, self.__jobs or None)
+
+    def __get_register_files(self, u):
+        return frozenset(map(os.path.abspath,
+                             u.get_register_files(self.__directory)))
+
+    # returns the ids of the enabled units and of the units which are
+    # used by them directly or indirectly.  Other units (e.g. disabled
+    # templates) do not contribute to the output; their registers are
+    # neither read nor merged.
+    @staticmethod
+    def __get_reachable(units):
+        pending = [u.get_id() for u in units.values() if u.is_enabled()]
+        res = set(pending)
+
+        while pending:
+            for b in units[pending.pop()].get_bases(units):
+                id = b.get_id()
+                if id not in res:
+                    res.add(id)
+                    pending.append(id)
+
+        return res
+
+    # reads and merges the complete model; returns the number of
+    # built units
+    def load(self):
+        self.__bga = self.__read_bga()
+        self.__reg_cache = unit.RegisterCache(self.__directory,
+                                              self.__defines)
+
+        unit_files = collections.OrderedDict()
+        objs = []
+        for f in self.__find_unit_files():
+            tmp = self.__read_unit_file(f)
+            unit_files[os.path.abspath(f)] = (f, [u.get_id() for u in tmp])
+            objs.extend(tmp)
+
+        units = block.Mergeable.create_container(objs, lambda x: x.get_id())
+        reg_files = {}
+        for (id, u) in units.items():
+            reg_files[id] = self.__get_register_files(u)
+
+        reachable = self.__get_reachable(units)
+        objs = [u for u in units.values() if u.get_id() in reachable]
+
+        self.__read_registers(objs)
+
+        block.MergeScheduler(units, objs).run()
+
+        self.__set_units(units)
+        self.__unit_files = unit_files
+        self.__reg_files = reg_files
+
+        return len(objs)
+
+    # updates the model after 'changed' files were modified, created
+    # or removed; returns the number of rebuilt units.  The model is
+    # left untouched when an exception is raised.
+    def update(self, changed):
+        changed = frozenset(map(os.path.abspath, changed))
+
+        # pins are modified by parsing registers; there is no way to
+        # rebuild only parts of the model
+        if self.__bga:
+            return self.load()
+
+        unit_files = collections.OrderedDict()
+        for f in self.__find_unit_files():
+            unit_files[os.path.abspath(f)] = (f, None)
+
+        affected = set()
+        fresh = {}
+
+        # step 1: read created, removed and changed unit files
+        for (k, (f, ids)) in self.__unit_files.items():
+            if k not in unit_files:
+                affected.update(ids)
+
+        for (k, (f, ids)) in unit_files.items():
+            old = self.__unit_files.get(k, (f, []))[1]
+
+            if k in changed or k not in self.__unit_files:
+                tmp = self.__read_unit_file(f)
+                ids = [u.get_id() for u in tmp]
+
+                affected.update(old)
+                affected.update(ids)
+                for u in tmp:
+                    fresh.setdefault(k, {})[u.get_id()] = u
+            else:
+                ids = old
+
+            unit_files[k] = (f, ids)
+
+        objs = []
+        for (k, (f, ids)) in unit_files.items():
+            for id in ids:
+                if k in fresh:
+                    objs.append(fresh[k][id])
+                else:
+                    objs.append(self.__units[id])
+
+        units = block.Mergeable.create_container(objs, lambda x: x.get_id())
+
+        # step 2: check which units use changed register files or
+        # have a different set of register files now
+        reg_files = {}
+        for (id, u) in units.items():
+            reg_files[id] = self.__get_register_files(u)
+
+            if (reg_files[id] != self.__reg_files.get(id) or
+                not changed.isdisjoint(reg_files[id])):
+                affected.add(id)
+
+        # other files (e.g. included by the preprocessor) can not be
+        # mapped to units; ignore vanished ones like temporary files
+        # of editors
+        known = set(unit_files.keys()) | set(self.__unit_files.keys())
+        for r in reg_files.values():
+            known.update(r)
+        for r in self.__reg_files.values():
+            known.update(r)
+
+        if any(map(os.path.exists, changed - known)):
+            return self.load()
+
+        # step 3: add units depending on affected ones
+        users = {}
+        for u in units.values():
+            for b in u.get_use():
+                users.setdefault(b, []).append(u.get_id())
+
+        pending = list(affected)
+        while pending:
+            for id in users.get(pending.pop(), []):
+                if id not in affected:
+                    affected.add(id)
+                    pending.append(id)
+
+        # units which became reachable have not been built yet;
+        # unreachable ones are not built at all
+        reachable = self.__get_reachable(units)
+        for id in reachable:
+            if not units[id].is_merged():
+                affected.add(id)
+
+        affected.intersection_update(reachable)
+
+        # step 4: affected units from unchanged files are merged
+        # already; read them again to get pristine objects
+        for (k, (f, ids)) in unit_files.items():
+            if k in fresh or affected.isdisjoint(ids):
+                continue
+
+            for u in self.__read_unit_file(f):
+                id = u.get_id()
+                if id in affected and units[id].is_merged():
+                    units[id] = u
+
+        # step 5: rebuild affected units; unaffected ones are merged
+        # already and serve as bases only
+        rebuilt = [u for u in units.values() if u.get_id() in affected]
+
+        self.__reg_cache.invalidate(changed)
+
+        self.__read_registers(rebuilt)
+
+        block.MergeScheduler(units, rebuilt).run()
+
+        self.__set_units(units)
+        self.__unit_files = unit_files
+        self.__reg_files = reg_files
+
+        return len(rebuilt)
@@ -15,25 +15,23 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import sys
 import glob
 import fileinput
-import functools
+import collections
 
 import block
 import generator
 
 class Top(block.Top):
     class __Parser(block.Parser):
+        ARG_RANGES = {
+            '@unit' : 1,
+        }
+
         def __init__(self, obj):
             super().__init__(obj)
 
-        def _validate(self, l):
-            ARG_RANGES = {
-                '@unit' : 1,
-            }
-
-            return self._validate_ranges(l, ARG_RANGES)
-
         def _parse(self, l, enabled):
             tag = l[0]
             res = None
@@ -46,13 +44,14 @@ class Top(block.Top):
 
             return res
 
+    _PARSERS = (__Parser,)
+
     def __init__(self, bga):
         block.Top.__init__(self)
-        self.add_parser(Top.__Parser(self))
         self.bga = bga
 
     def get_units(self):
-        return self.filter(lambda f: isinstance(f, Unit))
+        return self.get_child_index().values()
 
 class Unit(block.Block, block.Mergeable):
     ENDIAN_NATIVE	= 0
@@ -60,21 +59,18 @@ class Unit(block.Block, block.Mergeable):
     ENDIAN_BIG		= 2
 
     class __Parser(block.Parser):
+        ARG_RANGES = {
+            '@registers' : 1,
+            '@disabled' : 0,
+            '@name' : 1,
+            '@description' : 1,
+            '@reg' : 2,
+            '@regwidth' : [1, 4],
+        }
+
         def __init__(self, obj):
             super().__init__(obj)
 
-        def _validate(self, l):
-            ARG_RANGES = {
-                '@registers' : 1,
-                '@disabled' : 0,
-                '@name' : 1,
-                '@description' : 1,
-                '@reg' : 2,
-                '@regwidth' : [1, 4],
-            }
-
-            return self._validate_ranges(l, ARG_RANGES)
-
         def _parse(self, l, enabled):
             tag = l[0]
             res = self.o
@@ -105,19 +101,26 @@ class Unit(block.Block, block.Mergeable):
 
             return res
 
+    _PARSERS = (__Parser,)
+
+    __slots__ = (block.Mergeable._SLOTS +
+                 ('__id', '__regglobs', '__registers', '__sorted_registers',
+                  '__name',
+                  '__directory', '__is_enabled', '__memory', '__regwidth',
+                  '__addrwidth', '__endian_addr', '__endian_data', 'bga'))
+
     def __init__(self, top, name, is_valid):
         assert(isinstance(top, Top))
 
         block.Block.__init__(self, top, is_valid)
         block.Mergeable.__init__(self)
 
-        self.add_parser(Unit.__Parser(self))
-
-        self.__id = name
+        self.__id = sys.intern(name)
 
         self.__regglobs = []
 
         self.__registers = None
+        self.__sorted_registers = None
 
         self.__name = None
         self.__directory = None
@@ -138,10 +141,6 @@ class Unit(block.Block, block.Mergeable):
         return "UNIT <%x> %s@" % (id(self), self.__name) + mem + \
             " (%s, %s)" % (self.__regwidth, self.__addrwidth)
 
-    @staticmethod
-    def cmp_by_addr(self, b):
-        return self.__memory[0] - b.__memory[0]
-
     def _assign_regglobs(self, regs):
         self.__regglobs.append(regs)
 
@@ -149,7 +148,7 @@ class Unit(block.Block, block.Mergeable):
         self.__is_enabled = ena
 
     def _assign_name(self, name):
-        self.__name = name
+        self.__name = sys.intern(name)
 
     def _assign_regwidth(self, width):
         self.__regwidth = width
@@ -177,6 +176,9 @@ class Unit(block.Block, block.Mergeable):
     def get_id(self):
         return self.__id
 
+    def _get_index_key(self):
+        return self.__id
+
     def get_name(self):
         if not self.__name:
             return self.__id
@@ -186,10 +188,7 @@ class Unit(block.Block, block.Mergeable):
     def is_enabled(self):
         return self.__is_enabled
 
-    def read_registers(self, directory, defines):
-        import register
-
-        regs = []
+    def get_register_files(self, directory):
         reg_files = []
         for d in self.__regglobs:
             p = os.path.join(directory, d)
@@ -198,13 +197,27 @@ class Unit(block.Block, block.Mergeable):
 
         # TODO: warn about empty reg_files
 
+        return reg_files
+
+    def __set_registers(self, top):
+        self.__registers = collections.OrderedDict(top.get_child_index())
+
+    def read_registers(self, directory, defines):
+        import register
+
         #print(reg_files)
         top = register.Top(self)
 
-        top.iterate_files(reg_files, defines)
+        top.iterate_files(self.get_register_files(directory), defines)
 
-        regs = block.Mergeable.create_container(top.get_registers(),
-                                                lambda x: x.get_id(False))
+        self.__set_registers(top)
+
+    # attaches copies of the registers of 'top', which were parsed and
+    # merged by a RegisterCache
+    def _instantiate_registers(self, top):
+        regs = collections.OrderedDict()
+        for r in top.get_registers():
+            regs[r.get_id(False)] = r.instantiate(self)
 
         self.__registers = regs
 
@@ -216,29 +229,44 @@ class Unit(block.Block, block.Mergeable):
         assert(self.__registers != None)
         assert(not self.is_finalized())
 
-        for r in self.__registers.values():
-            r.merge(self.__registers)
+        block.MergeScheduler(self.__registers).run()
 
     def _merge(self, base):
         assert(isinstance(base, Unit))
         assert(not self.is_finalized())
         assert(base.is_finalized())
 
+        # registers of the base are instantiated for this unit; they
+        # share their fields with the base
         for r in base.__registers.values():
             id = r.get_id(False)
             if id in self.__registers:
                 self.__registers[id].update(r)
             else:
-                self.__registers[id] = r.clone(self)
+                self.__registers[id] = r.instantiate(self)
 
-            #print("  ", id, self.__registers[id])
+    def _merge_post(self):
+        # own registers come first, followed by the ones of the bases in
+        # '@use' order; this decides the order of registers with the same
+        # offset
+        regs = [r for r in self.__registers.values() if not r.is_template()]
+        regs.sort(key = lambda r: r.get_offset())
 
-        #print(self, base)
-        pass
+        self.__sorted_registers = regs
 
-    def _merge_post(self):
         self.finalize()
 
+    # returns the registers of the unit including the ones of the units
+    # it uses
+    def get_registers(self):
+        return self.__registers
+
+    # returns the registers which are not templates, ordered by their
+    # offset; registers with the same offset keep the order described
+    # in _merge_post()
+    def get_sorted_registers(self):
+        return self.__sorted_registers
+
     @staticmethod
     def __endian_symbol_part(end):
         if end == Unit.ENDIAN_NATIVE:
@@ -275,10 +303,7 @@ class Unit(block.Block, block.Mergeable):
         code.add_string(self.get_id(),   "Unit id")
         code.add_string(self.get_name(), "Unit name")
 
-        regs = list(filter(lambda x: not x.is_template(),
-                           self.__registers.values()))
-
-        regs.sort(key = functools.cmp_to_key(lambda a, b: a.cmp_by_addr(a, b)))
+        regs = self.__sorted_registers
 
         code.add_u8(self.get_addrwidth(), "addr width", "%u")
         code.add_type(end_sym, "endianess")
@@ -299,6 +324,9 @@ class Unit(block.Block, block.Mergeable):
     def get_address(self):
         return self.__memory[0]
 
+    def get_size(self):
+        return self.__memory[1]
+
     def get_regwidth(self):
         return self.__regwidth or 32
 
@@ -310,3 +338,91 @@ class Unit(block.Block, block.Mergeable):
 
     def get_endian_addr(self):
         return self.__endian_addr or Unit.ENDIAN_NATIVE
+
+# Parses register files once for all units which read the same files
+# with the same register width (e.g. several instances of a controller
+# which all say '@registers UART/').  Files are parsed on behalf of a
+# placeholder unit which knows only the id and the register width, and
+# the registers are merged among themselves; units get copies of these
+# registers which share the fields.
+#
+# This does not work when a BGA is used because parsing '@pin'
+# directives modifies its pins.
+class RegisterCache:
+    def __init__(self, directory, defines):
+        self.__directory = directory
+        self.__defines = defines
+        self.__tops = {}        # (files, regwidth) -> register.Top
+
+    # files are parsed in the given order which decides e.g. the order
+    # of registers with the same offset; units listing the same files
+    # in another order can not share them
+    def __get_key(self, u):
+        files = u.get_register_files(self.__directory)
+        return (tuple(map(os.path.abspath, files)), u.get_regwidth())
+
+    # forgets parsed files which are in 'changed'
+    def invalidate(self, changed):
+        for k in list(self.__tops.keys()):
+            if not changed.isdisjoint(k[0]):
+                del self.__tops[k]
+
+    @staticmethod
+    def __merge(top):
+        block.MergeScheduler(top.get_child_index()).run()
+
+        return top
+
+    # parses the register files which are not cached yet (in a pool
+    # of 'jobs' worker processes when 'jobs' is not 1) and attaches
+    # the registers to 'units'
+    def read(self, units, jobs = 1):
+        units = list(units)
+        if any(map(lambda u: u.have_bga(), units)):
+            raise Exception("shared register parsing not supported with BGA")
+
+        keys = list(map(self.__get_key, units))
+        args = {}
+        for (u, k) in zip(units, keys):
+            if k not in self.__tops and k not in args:
+                args[k] = (u.get_id(), u.get_regwidth(),
+                           u.get_register_files(self.__directory),
+                           self.__defines)
+
+        if jobs == 1 or len(args) < 2:
+            for (k, a) in args.items():
+                self.__tops[k] = self.__merge(_read_registers_job(*a))
+        else:
+            import concurrent.futures
+
+            settings = [block.save_settings()] * len(args)
+
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers = jobs) as executor:
+                for (k, top) in zip(args.keys(),
+                                    executor.map(_read_registers_worker,
+                                                 settings,
+                                                 *zip(*args.values()))):
+                    self.__tops[k] = self.__merge(top)
+
+        for (u, k) in zip(units, keys):
+            u._instantiate_registers(self.__tops[k])
+
+# runs '_read_registers_job' in a worker process; the settings of the
+# parent are restored first because workers are not necessarily forked
+def _read_registers_worker(settings, *args):
+    block.restore_settings(settings)
+    block.set_preprocessor_jobs(1)
+
+    return _read_registers_job(*args)
+
+def _read_registers_job(id, regwidth, reg_files, defines):
+    import register
+
+    u = Unit(Top(None), id, True)
+    u._assign_regwidth(regwidth)
+
+    top = register.Top(u)
+    top.iterate_files(reg_files, defines)
+
+    return top
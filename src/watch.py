@@ -0,0 +1,234 @@
+#! /usr/bin/python3
+
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import time
+import select
+import struct
+
+# Reports files below a directory which were modified, created or
+# removed.  'wait()' blocks until something changed and returns the
+# affected paths after changes settled for 'DELAY' seconds; editors
+# usually touch a file several times when saving it.  Hidden files
+# and backup files (e.g. swap files of editors) are not reported.
+class Watcher:
+    DELAY = 0.1
+
+    def __init__(self, directory, ignore = []):
+        self.directory = directory
+        self.ignore = frozenset(map(os.path.abspath, ignore))
+
+    def _filter(self, paths):
+        res = set()
+        for p in paths:
+            p = os.path.abspath(p)
+            base = os.path.basename(p)
+
+            if base.startswith('.') or base.endswith('~'):
+                continue
+
+            if p not in self.ignore:
+                res.add(p)
+
+        return res
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def create(directory, ignore = []):
+        try:
+            return InotifyWatcher(directory, ignore)
+        except OSError:
+            return PollingWatcher(directory, ignore)
+
+class PollingWatcher(Watcher):
+    INTERVAL = 0.5
+
+    def __init__(self, directory, ignore = []):
+        super().__init__(directory, ignore)
+        self.__state = self.__scan()
+
+    def __scan(self):
+        res = {}
+        for (path, dirs, files) in os.walk(self.directory):
+            for f in files:
+                f = os.path.join(path, f)
+                try:
+                    st = os.stat(f)
+                except FileNotFoundError:
+                    continue
+
+                res[f] = (st.st_mtime_ns, st.st_size, st.st_ino)
+
+        return res
+
+    def __diff(self, state):
+        res = set()
+        for (f, st) in state.items():
+            if self.__state.get(f) != st:
+                res.add(f)
+
+        res.update(set(self.__state.keys()) - set(state.keys()))
+
+        return self._filter(res)
+
+    def wait(self):
+        res = set()
+        while True:
+            time.sleep(res and self.DELAY or self.INTERVAL)
+
+            state = self.__scan()
+            tmp = self.__diff(state)
+            self.__state = state
+
+            if tmp:
+                res.update(tmp)
+            elif res:
+                return res
+
+class InotifyWatcher(Watcher):
+    IN_MODIFY      = 0x00000002
+    IN_ATTRIB      = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM  = 0x00000040
+    IN_MOVED_TO    = 0x00000080
+    IN_CREATE      = 0x00000100
+    IN_DELETE      = 0x00000200
+    IN_Q_OVERFLOW  = 0x00004000
+    IN_IGNORED     = 0x00008000
+    IN_ISDIR       = 0x40000000
+
+    MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+            IN_MOVED_TO | IN_CREATE | IN_DELETE)
+
+    __EVENT = struct.Struct('iIII')
+
+    def __init__(self, directory, ignore = []):
+        import ctypes
+        import ctypes.util
+
+        super().__init__(directory, ignore)
+
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno = True)
+            self.__add_watch = libc.inotify_add_watch
+            fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        except (AttributeError, TypeError) as e:
+            raise OSError("inotify not available: %s" % e)
+
+        if fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e))
+
+        self.__fd = fd
+        self.__watches = {}
+
+        for (path, dirs, files) in os.walk(directory):
+            self.__watch(path)
+
+    def __watch(self, path):
+        import ctypes
+
+        wd = self.__add_watch(self.__fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e), path)
+
+        self.__watches[wd] = path
+
+    def __read_events(self):
+        res = set()
+        try:
+            buf = os.read(self.__fd, 65536)
+        except BlockingIOError:
+            return res
+
+        pos = 0
+        while pos < len(buf):
+            (wd, mask, cookie, sz) = self.__EVENT.unpack_from(buf, pos)
+            pos += self.__EVENT.size
+
+            name = os.fsdecode(buf[pos:pos + sz].rstrip(b'\0'))
+            pos += sz
+
+            if mask & self.IN_Q_OVERFLOW:
+                # events were lost; report everything
+                for (path, dirs, files) in os.walk(self.directory):
+                    res.update(map(lambda f: os.path.join(path, f), files))
+                continue
+
+            if mask & self.IN_IGNORED:
+                self.__watches.pop(wd, None)
+                continue
+
+            path = os.path.join(self.__watches[wd], name)
+
+            if not (mask & self.IN_ISDIR):
+                res.add(path)
+            elif mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                # watch new directories and report files which were
+                # created before the watch was added
+                for (p, dirs, files) in os.walk(path):
+                    self.__watch(p)
+                    res.update(map(lambda f: os.path.join(p, f), files))
+
+        return res
+
+    def wait(self):
+        res = set()
+        while True:
+            timeout = res and self.DELAY or None
+
+            if not select.select([self.__fd], [], [], timeout)[0]:
+                tmp = self._filter(res)
+                if tmp:
+                    return tmp
+
+                res = set()
+                continue
+
+            res.update(self.__read_events())
+
+    def close(self):
+        os.close(self.__fd)
+
+# An output stream which is rewritten only when its content changes.
+# Regular files are truncated and written from the start; other
+# streams (e.g. pipes) get the new content appended.
+class Output:
+    def __init__(self, stream):
+        self.__stream = stream
+        self.__content = None
+
+    def get_stream(self):
+        return self.__stream
+
+    def write(self, content):
+        if content == self.__content:
+            return False
+
+        s = self.__stream
+        if s.seekable():
+            s.seek(0)
+            s.truncate()
+
+        s.write(content)
+        s.flush()
+
+        self.__content = content
+
+        return True
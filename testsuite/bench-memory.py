@@ -0,0 +1,94 @@
+#! /usr/bin/python3
+
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+## Measures the memory which is allocated by the parsed and merged
+## model of a synthetic description tree and reports it per field.
+## When the 'src' directory of another version (e.g. a checkout of an
+## older commit) is given, its model is measured too for comparison.
+##
+## Usage: bench-memory.py [<num-units> [<other-src>]]
+
+import os
+import sys
+import tempfile
+import subprocess
+
+from benchtree import create_tree
+
+SRCDIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# reads and merges all units of 'd' with the modules in 'srcdir';
+# prints the retained and the peak memory.  Only interfaces which
+# exist in all versions are used.
+def measure(srcdir, d):
+    import tracemalloc
+
+    sys.path.insert(0, srcdir)
+
+    import block
+    import unit
+
+    tracemalloc.start()
+
+    top = unit.Top(None)
+    top.iterate_files([os.path.join(d, 'all.unit')], [])
+
+    units = block.Mergeable.create_container(top.get_units(),
+                                             lambda x: x.get_id())
+    for u in units.values():
+        u.read_registers(d, [])
+
+    for u in units.values():
+        u.merge(units)
+
+    (cur, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(cur, peak)
+
+# measures in a new process so that the modules of several versions
+# can be compared
+def run(srcdir, d):
+    out = subprocess.check_output([sys.executable, os.path.abspath(__file__),
+                                   '--measure', srcdir, d],
+                                  universal_newlines = True)
+
+    return tuple(map(int, out.split()))
+
+def report(name, num_fields, mem):
+    (cur, peak) = mem
+    print("%-7s retained: %.1f MiB (%u bytes/field), "
+          "peak: %.1f MiB (%u bytes/field)" %
+          (name + ':', cur / 2**20, cur / num_fields,
+           peak / 2**20, peak / num_fields))
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--measure':
+        measure(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+
+    num_units = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    other     = sys.argv[2] if len(sys.argv) > 2 else None
+
+    with tempfile.TemporaryDirectory() as d:
+        num_fields = create_tree(d, num_units)
+
+        print("fields: %u" % num_fields)
+
+        if other:
+            report("before", num_fields, run(other, d))
+
+        report("after", num_fields, run(SRCDIR, d))
@@ -0,0 +1,68 @@
+#! /usr/bin/python3
+
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+## Measures the time for parsing a synthetic description tree without
+## token cache, with an empty (cold) and with a populated (warm) one.
+##
+## Usage: bench-token-cache.py [<num-units>]
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import block
+import cache
+import unit
+
+from benchtree import create_tree
+
+# parses all unit and register files of 'd'; this is the part of a
+# gendesc run which is affected by the token cache
+def run(d, cache_dir):
+    if cache_dir:
+        block.set_token_cache(cache.TokenCache(cache_dir))
+    else:
+        block.set_token_cache(None)
+
+    t   = time.monotonic()
+    top = unit.Top(None)
+    top.iterate_files([os.path.join(d, 'all.unit')], [])
+
+    for u in top.get_units():
+        u.read_registers(d, [])
+
+    return time.monotonic() - t
+
+if __name__ == '__main__':
+    num_units = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    with tempfile.TemporaryDirectory() as d:
+        tree  = os.path.join(d, 'tree')
+        cdir  = os.path.join(d, 'cache')
+
+        os.mkdir(tree)
+        create_tree(tree, num_units)
+
+        # best of three for the repeatable cases
+        none = min(run(tree, None) for _ in range(3))
+        cold = run(tree, cdir)
+        warm = min(run(tree, cdir) for _ in range(3))
+
+        print("units: %u, no cache: %.2fs, cold: %.2fs, warm: %.2fs, "
+              "speedup: %.2f" % (num_units, none, cold, warm, none / warm))
@@ -0,0 +1,44 @@
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+## Synthetic description trees for the bench-*.py scripts.
+
+import os
+
+# writes 'all.unit' with 'num_units' units into 'd'; every unit reads
+# its own register file with 'num_regs' registers of 'num_fields'
+# enum fields.  Returns the number of fields.
+def create_tree(d, num_units, num_regs = 16, num_fields = 8):
+    with open(os.path.join(d, 'all.unit'), 'w') as f:
+        for u in range(num_units):
+            f.write('@unit U%u\n' % u)
+            f.write('  @reg 0x%08x 0x1000\n' % (0x10000000 + u * 0x1000))
+            f.write('  @registers U%u/\n\n' % u)
+
+    for u in range(num_units):
+        os.mkdir(os.path.join(d, 'U%u' % u))
+        with open(os.path.join(d, 'U%u' % u, 'regs.reg'), 'w') as f:
+            for r in range(num_regs):
+                f.write('@register R%u\n' % r)
+                f.write('  @addr 0x%x\n' % (r * 4))
+                for i in range(num_fields):
+                    f.write('  @field F%u\n' % i)
+                    f.write('    @description "field %u of register %u"\n'
+                            % (i, r))
+                    f.write('    @bits %u-%u\n' % (i * 4 + 3, i * 4))
+                    f.write('    @enum 0 "off"  # disabled\n')
+                    f.write('    @enum 1 "on"\n')
+                f.write('\n')
+
+    return num_units * num_regs * num_fields
@@ -0,0 +1,166 @@
+#! /usr/bin/python3
+
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+## Checks AddressMap.lookup() against a linear scan and the messages
+## of AddressMap.check_overlaps(); exact aliases ('R1' and 'R2') are
+## not reported.  Registers of a unit which are inherited by '@use'
+## ('D') must report the id and address of this unit.
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import session
+
+UNITS = """
+@unit A
+  @reg 0x1000 0x100
+  @registers A/
+
+@unit B
+  @reg 0x2000 0x10
+  @regwidth 8
+  @registers B/
+
+@unit C
+  @reg 0x2008 0x10
+  @registers B/
+
+@unit _T
+  @disabled
+  @registers T/
+
+@unit D
+  @use _T
+  @reg 0x3000 0x10
+"""
+
+REGS = {
+    'A' : """
+@register CTRL
+  @addr 0x00
+@register DATA
+  @addr 0x08 64
+@register WIDE
+  @addr 0xf8 160
+@register _TMPL
+  @template
+  @addr 0x04
+""",
+    'B' : """
+@register R0
+  @addr 0x0
+@register R1
+  @addr 0x1
+@register R2
+  @addr 0x1
+@register R3
+  @addr 0x1 16
+""",
+    'T' : """
+@register CTRL
+  @addr 0x0
+@register STAT
+  @addr 0x4
+""",
+}
+
+EXPECTED = [
+    "unit 'B' (0x00002000-0x0000200f) overlaps 'C' (0x00002008-0x00002017)",
+    "A: register 'WIDE' (+0xf8) exceeds unit size 0x100",
+    "B: register 'R1' (+0x1) overlaps 'R3' (+0x1)",
+    "C: register 'R0' (+0x0) overlaps 'R1' (+0x1)",
+    "C: register 'R1' (+0x1) overlaps 'R3' (+0x1)",
+]
+
+def create_tree(d):
+    with open(os.path.join(d, 'all.unit'), 'w') as f:
+        f.write(UNITS)
+
+    for (u, regs) in REGS.items():
+        os.mkdir(os.path.join(d, u))
+        with open(os.path.join(d, u, 'regs.reg'), 'w') as f:
+            f.write(regs)
+
+def lookup_reference(units, addr):
+    for u in units:
+        if not (u.get_address() <= addr < u.get_address() + u.get_size()):
+            continue
+
+        for r in u.get_sorted_registers():
+            offs = addr - u.get_address()
+            if r.get_offset() <= offs < r.get_offset() + (r.get_regwidth() + 7) // 8:
+                return (u.get_id(), r.get_id(False))
+
+        return (u.get_id(), None)
+
+    return None
+
+def lookup(m, addr):
+    res = m.lookup(addr)
+    if res is None:
+        return None
+
+    return (res[0].get_id(), res[1] and res[1].get_id(False))
+
+if __name__ == '__main__':
+    ok = True
+
+    with tempfile.TemporaryDirectory() as d:
+        create_tree(d)
+
+        s = session.Session(d, frozenset())
+        s.load()
+
+        m = s.get_address_map()
+        units = s.get_units()
+
+        # overlapping units and registers are ambiguous; compare only
+        # the non-overlapping parts
+        for addr in list(range(0xff0, 0x1120)) + list(range(0x1ff0, 0x2008)):
+            ref = lookup_reference(units, addr)
+            res = lookup(m, addr)
+
+            if ref != res and not (addr in (0x2001, 0x2002)):
+                print("0x%x: got %s; expected %s" % (addr, res, ref),
+                      file = sys.stderr)
+                ok = False
+
+        if lookup(m, 0x1003) != ('A', 'CTRL') or \
+           lookup(m, 0x1004) != ('A', None) or \
+           lookup(m, 0x100f) != ('A', 'DATA') or \
+           lookup(m, 0x10ff) != ('A', 'WIDE') or \
+           lookup(m, 0x2018) != None:
+            print("lookup: unexpected results", file = sys.stderr)
+            ok = False
+
+        (u, r) = m.lookup(0x3004)
+        if (u.get_id() != 'D' or r.get_id() != 'D_STAT' or
+            r.expand_address() != 0x3004):
+            print("lookup: got %s, %s at 0x%x" %
+                  (u.get_id(), r.get_id(), r.expand_address()),
+                  file = sys.stderr)
+            ok = False
+
+        msgs = m.check_overlaps()
+        if msgs != EXPECTED:
+            print("overlaps: got %s" % msgs, file = sys.stderr)
+            ok = False
+
+    if not ok:
+        sys.exit(1)
@@ -0,0 +1,101 @@
+#! /usr/bin/python3
+
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+## Checks that BitField.convert_values() converts enum values like
+## the bit-by-bit scatter and gather of the original implementation
+## and the detection of contiguous bits.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from register import Field
+
+# bit specification and the expected shift (None when the bits are
+# not contiguous)
+BITS = [
+    (['3-0'], 0),
+    (['0-3'], 0),
+    (['5'], 5),
+    (['7-4', '0'], None),
+    (['1,3'], None),
+    (['3,1,2,0'], 0),
+    (['15-8', '0-7'], 0),
+    (['0-23'], 0),
+    (['31-0'], 0),
+    (['12-9', '8'], 8),
+    (['2,0,1', '9-7'], None),
+    (['0,2,4,6,8,10,12,14,16,18'], None),
+]
+
+def convert_reference(bits, v):
+    tmp = 0
+    msk = 0
+    for b in bits:
+        tmp |= (v & 1) << b
+        msk |= (1 << b)
+        v  >>= 1
+
+    assert(v == 0)
+
+    res = 0
+    while msk != 0:
+        if msk & 1:
+            res <<= 1
+            res  |= tmp & 1
+
+        msk >>= 1
+        tmp >>= 1
+
+    return res
+
+def check(spec, shift):
+    bits = Field.BitField(spec)
+    n    = len(bits)
+
+    ok = True
+    if bits.get_shift() != shift or bits.is_contiguous() != (shift is not None):
+        print("%s: shift %s; expected %s" % (spec, bits.get_shift(), shift),
+              file = sys.stderr)
+        ok = False
+
+    # sparse values for wide fields; both the grouped and the table
+    # based conversion are used
+    if n <= 10:
+        values = list(range(1 << n))
+    else:
+        values = [(i * 0x9e3779b1) & ((1 << n) - 1) for i in range(100)]
+
+    for vals in [values, values[:3]]:
+        ref = [convert_reference(list(bits), v) for v in vals]
+        res = bits.convert_values(vals)
+
+        if ref != res:
+            print("%s: mismatch %s vs. %s" % (spec, ref[:8], res[:8]),
+                  file = sys.stderr)
+            ok = False
+
+    return ok
+
+if __name__ == '__main__':
+    ok = True
+
+    for (spec, shift) in BITS:
+        ok = check(spec, shift) and ok
+
+    if not ok:
+        sys.exit(1)
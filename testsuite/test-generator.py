@@ -0,0 +1,87 @@
+#! /usr/bin/python3
+
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+## Checks that CodeObject.emit_to() writes the same content as
+## CodeObject.emit() returns for all output formats, and that walking
+## the model once with a MultiCodeBlock creates the same outputs.
+## Results of multiplexed calls which are not blocks are tested like
+## the ones of a single call.
+
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import generator
+import generator_cdef
+import generator_cfill
+import generator_stream
+import session
+
+FACTORIES = {
+    'c-defines'    : (generator_cdef.CodeFactory, io.StringIO),
+    'c-fill'       : (generator_cfill.CodeFactory, io.StringIO),
+    'datastream'   : (lambda: generator_stream.CodeFactory(
+                          generator_stream.LITTLE_ENDIAN, False), io.BytesIO),
+    'datastream-c' : (lambda: generator_stream.CodeFactory(
+                          generator_stream.BIG_ENDIAN, True), io.BytesIO),
+}
+
+def generate(top, units):
+    top.add_size_t(len(units), "number of units")
+    for u in units:
+        u.generate_code(top)
+
+if __name__ == '__main__':
+    ok = True
+
+    s = session.Session(os.path.join(os.path.dirname(__file__), 'data-0'),
+                        frozenset())
+    s.load()
+
+    multi = [generator.CodeGenerator(f()) for (f, _) in FACTORIES.values()]
+    generate(generator.MultiCodeBlock(multi), s.get_units())
+
+    for ((name, (factory, sink)), m) in zip(FACTORIES.items(), multi):
+        g = generator.CodeGenerator(factory())
+        generate(g, s.get_units())
+
+        res = g.emit()
+        if res != m.emit():
+            print("%s: MultiCodeBlock output differs" % name, file = sys.stderr)
+            ok = False
+
+        out = sink()
+        g.emit_to(out.write)
+
+        if not res or res != out.getvalue():
+            print("%s: emit_to() differs from emit()" % name, file = sys.stderr)
+            ok = False
+
+    m = generator.MultiCodeBlock([generator.CodeGenerator(f())
+                                  for (f, _) in FACTORIES.values()])
+    res = [m.add_and_test_existing('sym'), m.add_and_test_existing('sym')]
+    if res != [False, True]:
+        print("add_and_test_existing: got %s" % res, file = sys.stderr)
+        ok = False
+
+    if m.add_u8(1, "value") is not None:
+        print("add_u8: unexpected result", file = sys.stderr)
+        ok = False
+
+    if not ok:
+        sys.exit(1)
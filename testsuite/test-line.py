@@ -0,0 +1,257 @@
+#! /usr/bin/python3
+
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+## Checks that Line.parse() tokenizes exactly like the reference state
+## machine.
+
+import os
+import sys
+import glob
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from line import Line
+
+EXTRA_LINES = [
+    'x',
+    '  x',
+    '#',
+    '#\\',
+    '#a\\',
+    '"abc"x',
+    '"abc"xy',
+    'foo#bar',
+    'foo #bar \\',
+    'abc\\',
+    'abc\\ ',
+    'a , , b',
+    'a ,b,c',
+    '\t\t @tag a',
+    '"cont\\',
+    'inued"',
+    '',
+    '@tag \\',
+    '',
+    '   ',
+    '   last',
+]
+
+class IndentLevel:
+    def __init__(self):
+        self.i = 0
+
+    def inc(self, c):
+        if c == ' ':
+            self.i += 1
+        elif c == '\t':
+            self.i = (self.i + 8) // 8 * 8
+        else:
+            raise Exception("Bad char for indentation")
+
+# character based state machine which was used by Line.parse() before;
+# as a former method of 'Line', it accesses the private methods of the
+# line it fills
+def parse_reference(l, prev_line):
+    res = prev_line
+    if not res:
+        res = Line()
+
+    end_quote = None
+
+    l = l.rstrip('\n\r')
+
+    #print("== >%s<" % l)
+    l = list(l)
+    if not l:
+        state = -1
+    else:
+        end_quote = res.get_expected_quote()
+        if end_quote:
+            tmp   = ''
+            state = 22
+        else:
+            tmp = None
+            state = 0
+
+        c = l.pop(0)
+
+    indent_lvl = IndentLevel()
+    while state != -1:
+        if state == 0:
+            # start of line
+            if not l:
+                state = 99
+            elif c in [' ', '\t']:
+                indent_lvl.inc(c)
+                c = l.pop(0)
+            elif c in ['#']:
+                c = l.pop(0)
+                state = 1
+            else:
+                state = 2
+        elif state == 1:
+            # comment
+            if len(l) > 0 and l[-1] == '\\':
+                state = 98
+            else:
+                state = 99
+        elif state == 2:
+            # normal input; check EOL condition
+            if l:
+                state = 4
+            else:
+                state = 99
+        elif state == 4:
+            # post state 2; initialize
+            assert(l)
+            tmp = ''
+            end_quote = None
+            state = 21
+        elif state == 3:
+            # normal input; continue token
+            if l:
+                c = l.pop(0)
+                state = 20
+            else:
+                res._Line__add_token(tmp)
+                tmp = None
+                state = 99
+        elif state == 20:
+            # normal input; process
+            if c in [' ', '\t']:
+                # whitespace input
+                res._Line__add_token(tmp)
+                state = 2
+            elif c in ["'", '"']:
+                # quoted input
+                end_quote = c
+                state = 22
+                c     = l.pop(0)
+            elif c == '#':
+                state = 1
+            elif c != '\\':
+                # normal (non-backslashified) input
+                tmp  += c
+                state = 3
+            elif l:
+                # backslashified input within line
+                tmp  += l.pop(0)
+                state = 3
+            else:
+                # backslash at end of line
+                state = 98
+        elif state == 21:
+            # whitespace in normal input
+            if c == ',':
+                state = 24
+            elif c not in [' ', '\t']:
+                state = 20
+            elif l:
+                c = l.pop(0)
+            else:
+                state = 99
+        elif state == 22:
+            # quoted input
+            assert(end_quote)
+            if c == end_quote:
+                res._Line__add_token(tmp)
+                state = 23
+            elif c != '\\':
+                tmp += c
+                c = l.pop(0)
+            elif l:
+                tmp += l.pop(0)
+                c = l.pop(0)
+            else:
+                res._Line__add_token(tmp, end_quote)
+                state = 98
+        elif state == 23:
+            # end_quote has been read; fetch next char
+            if l:
+                c = l.pop(0)
+            state = 2
+        elif state == 24:
+            # comma ',' between eleemnts
+            if res.open_list:
+                res._Line__add_token('')
+
+            res.open_list = True
+
+            if l:
+                c = l.pop(0)
+                state = 21
+            else:
+                state = 99
+        elif state == 98:
+            # backslashified line
+            res._Line__set_complete(False, indent_lvl.i)
+            state = -1
+        elif state == 99:
+            res._Line__set_complete(True, indent_lvl.i)
+            state = -1
+        else:
+            raise Exception("Unsupported state %d" % state)
+
+        #print(state, tmp, c)
+
+    if res and res.is_complete() and not res.tokens:
+        res = Line()
+
+    return res
+
+def tokenize(fn, lines):
+    res = []
+    l   = None
+
+    for txt in lines:
+        l = fn(txt, l)
+        if l.is_complete():
+            res.append((l.tokens, l.expand([])[1]))
+            l = None
+        else:
+            res.append((None, l.get_expected_quote()))
+
+    return res
+
+def check(name, lines):
+    a = tokenize(parse_reference, lines)
+    b = tokenize(Line.parse, lines)
+
+    if a != b:
+        for (i, (x, y)) in enumerate(zip(a, b)):
+            if x != y:
+                print("%s:%u: mismatch %s vs. %s" % (name, i + 1, x, y),
+                      file = sys.stderr)
+                break
+
+        return False
+
+    return True
+
+if __name__ == '__main__':
+    datadir = os.path.join(os.path.dirname(__file__), 'data-0')
+    files   = sorted(glob.glob(os.path.join(datadir, '*.unit')) +
+                     glob.glob(os.path.join(datadir, '*', '*.reg')))
+    ok      = True
+
+    for f in files:
+        with open(f) as input:
+            ok = check(f, input.readlines()) and ok
+
+    ok = check('<extra>', EXTRA_LINES) and ok
+
+    if not ok:
+        sys.exit(1)
@@ -0,0 +1,119 @@
+#! /usr/bin/python3
+
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+## Checks that the m4lite engine expands like 'm4 -E -Q -P' and that
+## the 'm4-lite' preprocessor falls back to m4 for other builtins.
+
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import m4lite
+import block
+
+LIBDIR = os.path.join(os.path.dirname(__file__), '..', 'lib')
+
+INPUTS = {
+    'plain' : """##!m4-lite
+@unit FOO
+  @addr 0x1000
+""",
+
+    'define' : """##!m4-lite
+m4_define(`REG', `@register $1
+  @addr $2')m4_dnl
+REG(CTRL, 0x00)
+REG(`STATUS', 0x04)
+# comment REG(x, y)
+m4_ifelse(`a', `b', `no', `a', `a', `yes', `else')
+m4_ifelse(`a', `b', `no')
+m4_define(`X', `1')m4_pushdef(`X', `2')X m4_popdef(`X')X
+""",
+
+    'foreach' : """##!m4-lite
+m4_include(`cpudef.m4')m4_dnl
+foreach(`n', `(0, 1, 2, 3)', `@register IRQ`'n
+  @addr eval_not_used n
+')m4_dnl
+m4_define
+last line without newline""",
+
+    'args' : """##!m4-lite
+m4_define(`CNT', `$#:$*:$@')m4_dnl
+CNT(a, `b,c', (d, e))
+m4_shift(a, b, c)
+""",
+
+    'fallback' : """##!m4-lite
+m4_define(`A', `line')m4_dnl
+A 1
+A 2
+m4_eval(1 + 2)
+A 3
+""",
+}
+
+def run_m4(fname):
+    return subprocess.check_output(['m4', '-E', '-Q', '-P', '-I', LIBDIR, fname],
+                                   universal_newlines = True)
+
+def run_lite(fname):
+    with block._preprocessors['m4-lite'].call(fname) as input:
+        return ''.join(input)
+
+def check(tmpdir, name, text):
+    fname = os.path.join(tmpdir, name + '.unit')
+    with open(fname, 'w') as f:
+        f.write(text)
+
+    a = run_m4(fname)
+    b = run_lite(fname)
+
+    if a != b:
+        print("%s: mismatch\n--- m4\n%s--- m4-lite\n%s" % (name, a, b),
+              file = sys.stderr)
+        return False
+
+    return True
+
+if __name__ == '__main__':
+    tmpdir = tempfile.mkdtemp()
+    ok     = True
+
+    try:
+        # 'm4_include' looks in the directory of the main file
+        shutil.copy(os.path.join(LIBDIR, 'cpudef.m4'), tmpdir)
+
+        for (name, text) in sorted(INPUTS.items()):
+            ok = check(tmpdir, name, text) and ok
+
+        try:
+            for l in m4lite.Engine(os.path.join(tmpdir, 'fallback.unit')).lines():
+                pass
+
+            print("fallback: 'm4_eval' not rejected", file = sys.stderr)
+            ok = False
+        except m4lite.Unsupported:
+            pass
+    finally:
+        shutil.rmtree(tmpdir)
+
+    if not ok:
+        sys.exit(1)
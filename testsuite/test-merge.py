@@ -0,0 +1,134 @@
+#! /usr/bin/python3
+
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+## Checks the levels computed by MergeScheduler, the diagnostics for
+## circular and unknown '@use' dependencies and that merging registers
+## does not modify their bases.
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import block
+import session
+import unit
+
+# unit id -> ids of used units
+CHAIN = {
+    'A' : [],
+    'B' : ['A'],
+    'C' : ['A'],
+    'D' : ['B', 'C'],
+    'E' : [],
+}
+
+def read_units(d, graph):
+    fname = os.path.join(d, 'all.unit')
+    with open(fname, 'w') as f:
+        for (id, use) in graph.items():
+            f.write('@unit %s\n' % id)
+            for u in use:
+                f.write('  @use %s\n' % u)
+
+    top = unit.Top(None)
+    top.iterate_files([fname], [])
+
+    return (fname, block.Mergeable.create_container(top.get_units(),
+                                                    lambda x: x.get_id()))
+
+def check_error(d, name, graph, expected):
+    (fname, units) = read_units(d, graph)
+    try:
+        block.MergeScheduler(units)
+        msg = None
+    except Exception as e:
+        msg = str(e)
+
+    if msg != expected % fname:
+        print("%s: got %r; expected %r" % (name, msg, expected % fname),
+              file = sys.stderr)
+        return False
+
+    return True
+
+# 'R' uses 'A' and '_B'; naming the enum of the field taken from 'A'
+# must not rename the one of 'A'
+SHARED_ENUMS = """
+@register A
+  @addr 0
+  @field F
+    @bits 3-0
+    @enum 1
+
+@register _B
+  @template
+  @field F
+    @bits 3-0
+    @enum 1 "ONE"
+
+@register R
+  @addr 4
+  @use A
+  @use _B
+"""
+
+def check_shared_enums(d):
+    with open(os.path.join(d, 'all.unit'), 'w') as f:
+        f.write('@unit U\n  @reg 0 0x100\n  @registers U/\n')
+
+    os.mkdir(os.path.join(d, 'U'))
+    with open(os.path.join(d, 'U', 'regs.reg'), 'w') as f:
+        f.write(SHARED_ENUMS)
+
+    s = session.Session(d, frozenset())
+    s.load()
+
+    regs = s.get_units()[0].get_registers()
+    names = [regs[r].get_fields()['F'].get_enums()[1].get_name()
+             for r in ['A', 'R']]
+
+    if names != ['1', 'ONE']:
+        print("shared enums: got %s" % names, file = sys.stderr)
+        return False
+
+    return True
+
+if __name__ == '__main__':
+    ok = True
+
+    with tempfile.TemporaryDirectory() as d:
+        (_, units) = read_units(d, CHAIN)
+        levels = block.MergeScheduler(units).get_levels()
+        levels = [sorted(u.get_id() for u in l) for l in levels]
+
+        if levels != [['A', 'E'], ['B', 'C'], ['D']]:
+            print("levels: got %s" % levels, file = sys.stderr)
+            ok = False
+
+        ok = check_error(d, "cycle", { 'A' : ['C'], 'B' : ['A'], 'C' : ['B'] },
+                         "%s:4: circular '@use' dependency: A -> C -> B -> A") and ok
+        ok = check_error(d, "self", { 'A' : ['A'] },
+                         "%s:2: circular '@use' dependency: A -> A") and ok
+        ok = check_error(d, "unknown", { 'A' : [], 'B' : ['A', 'X'] },
+                         "%s:4: unknown base 'X'") and ok
+
+    with tempfile.TemporaryDirectory() as d:
+        ok = check_shared_enums(d) and ok
+
+    if not ok:
+        sys.exit(1)
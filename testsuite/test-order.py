@@ -0,0 +1,177 @@
+#! /usr/bin/python3
+
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+## Checks the order in which units with the same address, registers
+## with the same offset and fields with the same lowest bit are
+## emitted.  Units keep the order of their definition; own registers
+## and fields come first, followed by the ones of the '@use'd objects
+## in '@use' order.  The expected ids were taken from the output of the
+## original implementation.  Units which read the same register files
+## in another order ('F' and 'G') emit them in their own order.
+
+import os
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import generator
+import generator_cfill
+import session
+
+FILES = {
+    'all.unit' : """
+@unit _A
+  @disabled
+  @registers A/
+
+@unit _C
+  @disabled
+  @use _A
+  @registers C/
+
+@unit _D
+  @disabled
+  @registers D/
+
+@unit E
+  @use _D
+  @reg 0x1000 0x100
+
+@unit B
+  @use _C
+  @use _D
+  @reg 0x1000 0x100
+  @registers B/
+
+@unit F
+  @reg 0x2000 0x100
+  @registers F/x.reg
+  @registers F/y.reg
+
+@unit G
+  @reg 0x3000 0x100
+  @registers F/y.reg
+  @registers F/x.reg
+""",
+
+    'A/regs.reg' : """
+@register TXDATA
+  @addr 0
+  @field TX
+    @uint 7-0
+
+@register CTRL
+  @addr 4
+  @field EN_A
+    @boolean 0
+  @field MODE
+    @uint 3-1
+
+@register _CTRL
+  @template
+  @field EN_T
+    @boolean 0
+  @field HI
+    @uint 7-4
+
+@register CTRL2
+  @addr 8
+  @use _CTRL
+  @field EN_OWN
+    @boolean 0
+  @field LO
+    @uint 3-0
+""",
+
+    'F/x.reg' : """
+@register X
+  @addr 0
+  @field X
+    @uint 7-0
+""",
+
+    'F/y.reg' : """
+@register Y
+  @addr 0
+  @field Y
+    @uint 7-0
+""",
+
+    'B/regs.reg' : """
+@register RXDATA
+  @addr 0
+  @field RX
+    @uint 7-0
+""",
+
+    'C/regs.reg' : """
+@register CDATA
+  @addr 0
+  @field C
+    @uint 7-0
+""",
+
+    'D/regs.reg' : """
+@register DDATA
+  @addr 0
+  @field D
+    @uint 7-0
+
+@register STAT
+  @addr 4
+  @field S
+    @uint 7-0
+""",
+}
+
+# ids of registers and fields in the order they are emitted
+EXPECTED = [
+    'E_DDATA', 'D', 'E_STAT', 'S',
+    'B_RXDATA', 'RX', 'B_CDATA', 'C', 'B_TXDATA', 'TX', 'B_DDATA', 'D',
+    'B_CTRL', 'EN_A', 'MODE', 'B_STAT', 'S',
+    'B_CTRL2', 'EN_OWN', 'LO', 'EN_T', 'HI',
+    'F_X', 'X', 'F_Y', 'Y',
+    'G_Y', 'Y', 'G_X', 'X',
+]
+
+def create_tree(d):
+    for (name, content) in FILES.items():
+        fname = os.path.join(d, name)
+        os.makedirs(os.path.dirname(fname), exist_ok = True)
+        with open(fname, 'w') as f:
+            f.write(content)
+
+def emitted_ids(d):
+    s = session.Session(d, frozenset())
+    s.load()
+
+    g = generator.CodeGenerator(generator_cfill.CodeFactory())
+    for u in s.get_units():
+        u.generate_code(g)
+
+    return re.findall(r'push_data16\([^,]*, "([^"]*)"\);\s*/\* id \*/',
+                      g.emit())
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as d:
+        create_tree(d)
+        ids = emitted_ids(d)
+
+    if ids != EXPECTED:
+        print("got %s; expected %s" % (ids, EXPECTED), file = sys.stderr)
+        sys.exit(1)
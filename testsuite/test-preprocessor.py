@@ -0,0 +1,110 @@
+#! /usr/bin/python3
+
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+## Checks the caching 'm4' preprocessor: temporary debug files must be
+## removed when m4 fails and cached output must not be used when an
+## included file is shadowed by a new one.
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import block
+import cache
+
+def write(fname, content):
+    with open(fname, 'w') as f:
+        f.write(content)
+
+def preprocess(fname, spool):
+    with block._preprocessors['m4'].call(fname, spool) as input:
+        return ''.join(input)
+
+def check_failure(d, spool):
+    fname = os.path.join(d, 'fail.reg')
+    write(fname, "m4_include(`nonexistent.m4')\n")
+
+    tmpdir = os.path.join(d, 'tmp-%s' % spool)
+    os.mkdir(tmpdir)
+
+    old = tempfile.tempdir
+    tempfile.tempdir = tmpdir
+    try:
+        preprocess(fname, spool)
+        failed = False
+    except Exception:
+        failed = True
+    finally:
+        tempfile.tempdir = old
+
+    if not failed:
+        print("spool=%s: m4 did not fail" % spool, file = sys.stderr)
+        return False
+
+    left = os.listdir(tmpdir)
+    if left:
+        print("spool=%s: files left: %s" % (spool, left), file = sys.stderr)
+        return False
+
+    return True
+
+def check_shadowing(d):
+    subdir = os.path.join(d, 'sub')
+    os.mkdir(subdir)
+
+    fname = os.path.join(subdir, 'main.reg')
+    write(fname, "m4_include(`inc.m4')\n")
+    write(os.path.join(subdir, 'inc.m4'), "A\n")
+
+    ok = True
+    old = os.getcwd()
+    os.chdir(d)
+    try:
+        for exp in ["A\n\n", "A\n\n"]:
+            res = preprocess(fname, False)
+            if res != exp:
+                print("unexpected output %r" % res, file = sys.stderr)
+                ok = False
+
+        # the current directory is searched before the one of 'main.reg'
+        write(os.path.join(d, 'inc.m4'), "B\n")
+
+        res = preprocess(fname, False)
+        if res != "B\n\n":
+            print("shadowing file ignored: %r" % res, file = sys.stderr)
+            ok = False
+    finally:
+        os.chdir(old)
+
+    return ok
+
+if __name__ == '__main__':
+    ok = True
+
+    with tempfile.TemporaryDirectory() as d:
+        os.mkdir(os.path.join(d, 'cache'))
+        block.set_preprocessor_cache(cache.PreprocessorCache(
+            os.path.join(d, 'cache'), 'm4'))
+
+        for spool in [False, True]:
+            ok = check_failure(d, spool) and ok
+
+        ok = check_shadowing(d) and ok
+
+    if not ok:
+        sys.exit(1)
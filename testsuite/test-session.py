@@ -0,0 +1,125 @@
+#! /usr/bin/python3
+
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+## Checks that Session.update() rebuilds only the affected units and
+## results in the same model as reading everything again.  Registers
+## of the disabled and unused 'TMPL' unit are invalid and must never be
+## read.
+
+import os
+import sys
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import generator
+import generator_cfill
+from session import Session
+
+DERIV_UNIT = """\
+@unit DERIV
+  @reg 0xf0020000 0x1000
+  @use CLONE
+  @registers DERIV/
+"""
+
+DERIV_REG = """\
+@register EXTRA
+  @addr 0x40
+  @field F
+    @integer 3-0
+"""
+
+TMPL_UNIT = """\
+@unit TMPL
+  @disabled
+  @reg 0xf0030000 0x1000
+  @registers TMPL/
+"""
+
+TMPL_REG = """\
+@invalid
+"""
+
+# (<file>, <function>, <expected number of rebuilt units>)
+EDITS = [
+    ('DERIV/DERIV.reg', lambda s: s.replace('3-0', '4-0'),         1),
+    ('CLONE/core.reg',  lambda s: s.replace('ENUM-3', 'ENUM-X'),   2),
+    ('IC/base.reg',     lambda s: s + '\n',                        4),
+    ('TEST-0.unit',     lambda s: s.replace('0x4000', '0x4800'),   3),
+    ('DERIV.unit',      lambda s: s.replace('@use CLONE\n', ''),   1),
+    ('TMPL/TMPL.reg',   lambda s: s + '\n',                        0),
+]
+
+def emit(session):
+    units = session.get_units()
+    g = generator.CodeGenerator(generator_cfill.CodeFactory())
+
+    g.add_size_t(len(units), "number of units")
+    for u in units:
+        u.generate_code(g)
+
+    return g.emit()
+
+def edit(directory, name, fn):
+    fname = os.path.join(directory, name)
+    with open(fname) as f:
+        data = f.read()
+
+    with open(fname, 'w') as f:
+        f.write(fn(data))
+
+    return fname
+
+if __name__ == '__main__':
+    datadir = os.path.join(os.path.dirname(__file__), 'data-0')
+    ok      = True
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        d = os.path.join(tmpdir, 'data')
+        shutil.copytree(datadir, d)
+        for (name, unit, reg) in [('DERIV', DERIV_UNIT, DERIV_REG),
+                                  ('TMPL', TMPL_UNIT, TMPL_REG)]:
+            os.mkdir(os.path.join(d, name))
+
+            with open(os.path.join(d, name + '.unit'), 'w') as f:
+                f.write(unit)
+            with open(os.path.join(d, name, name + '.reg'), 'w') as f:
+                f.write(reg)
+
+        s = Session(d, frozenset())
+        s.load()
+
+        for (name, fn, cnt) in EDITS:
+            fname = edit(d, name, fn)
+            res = s.update([fname])
+
+            ref = Session(d, frozenset())
+            ref.load()
+
+            if res != cnt:
+                print("%s: rebuilt %u units; expected %u" % (name, res, cnt),
+                      file = sys.stderr)
+                ok = False
+
+            if emit(s) != emit(ref):
+                print("%s: model differs from full rebuild" % name,
+                      file = sys.stderr)
+                ok = False
+
+    if not ok:
+        sys.exit(1)
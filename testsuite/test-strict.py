@@ -0,0 +1,144 @@
+#! /usr/bin/python3
+
+# Copyright (C) 2026 Enrico Scholz <enrico.scholz@sigma-chemnitz.de>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; version 3 of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+## Checks parsing with strict indentation: correctly indented input
+## results in the same model as non-strict parsing, mis-indented
+## directives are reported and '@end' and conditional directives
+## close the right blocks.
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import block
+import generator
+import generator_cfill
+import session
+
+UNITS = """
+@unit U
+  @reg 0x0 0x100
+  @registers U/
+"""
+
+# nested fields and enums with conditional directives and '@end'
+REGS = """
+@register R
+  @addr 0
+  @field A
+    @bits 3-0
+    @enum 0 "zero"
+    @enum[never] 1 "one"
+    @description[never] "disabled description"
+    @enum 2 "two"
+  @field[never] A
+    @uint 7-0
+  @field B
+    @bits 7-4
+    @enum 1 "on"
+    @end
+  @field C
+    @boolean 8
+
+@register S
+  @addr 4
+  @field D
+    @uint 3-0
+"""
+
+def generate(d, strict):
+    block.set_strict_indentation(strict)
+    try:
+        s = session.Session(d, frozenset(['cond']))
+        s.load()
+    finally:
+        block.set_strict_indentation(False)
+
+    g = generator.CodeGenerator(generator_cfill.CodeFactory())
+    for u in s.get_units():
+        u.generate_code(g)
+
+    return g.emit()
+
+def create_tree(d, regs):
+    with open(os.path.join(d, 'all.unit'), 'w') as f:
+        f.write(UNITS)
+
+    os.makedirs(os.path.join(d, 'U'), exist_ok = True)
+    with open(os.path.join(d, 'U', 'regs.reg'), 'w') as f:
+        f.write(regs)
+
+def check_same(name, d):
+    if generate(d, True) != generate(d, False):
+        print("%s: strict model differs" % name, file = sys.stderr)
+        return False
+
+    return True
+
+def check_error(name, d, expected):
+    try:
+        generate(d, True)
+        msg = None
+    except Exception as e:
+        msg = str(e)
+
+    if msg != expected:
+        print("%s: got %r; expected %r" % (name, msg, expected),
+              file = sys.stderr)
+        return False
+
+    return True
+
+if __name__ == '__main__':
+    ok = True
+
+    ok = check_same("data-0", os.path.join(os.path.dirname(__file__),
+                                            'data-0')) and ok
+
+    with tempfile.TemporaryDirectory() as d:
+        create_tree(d, REGS)
+        ok = check_same("nested", d) and ok
+
+        ref = generate(d, False)
+
+        # a disabled '@end' does not close the enum or the field
+        create_tree(d, REGS.replace('    @enum 0 "zero"\n',
+                                    '    @enum 0 "zero"\n'
+                                    '    @end[never]\n'))
+        if generate(d, True) != ref:
+            print("disabled @end: model differs", file = sys.stderr)
+            ok = False
+
+        # '@end' closes the innermost block which encloses it, even
+        # when the next directive is indented deeper
+        create_tree(d, REGS.replace('    @end\n  @field C\n    @boolean 8\n',
+                                    '    @end\n    @field C\n'
+                                    '      @boolean 8\n'))
+        if generate(d, True) != ref:
+            print("@end: model differs", file = sys.stderr)
+            ok = False
+
+        create_tree(d, REGS.replace('    @uint 3-0', '  @uint 3-0'))
+        ok = check_error("mis-indented", d,
+                         "Unexpected '@uint' at indentation level 2") and ok
+
+        create_tree(d, REGS + "  @end\n@end\n")
+        ok = check_error("unbalanced @end", d, "Unexpected '@end'") and ok
+
+    if not ok:
+        sys.exit(1)